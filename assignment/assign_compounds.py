@@ -78,11 +78,18 @@ import numpy as np
 
 from decoding.peak_decoder import MoccaPeakDecoder
 from predictions.rxn_classes import ChemicalReaction
+from predictions.ms_pred.ms_pred import IonizationProfile, predict_ms_spectra
+from predictions.rt_pred.backends import RTBackend
+from predictions.forward_backends import ForwardBackend
 from ms_pred.decode_ms import load_run, get_spectrum_at_rt
 from scoring.score_ms import cosine_similarity_aligned
 from scoring.score_rt import gaussian_rt_score
 from scoring.score_lmax import gaussian_lmax_score
 from scoring.score_aggregate import build_score_matrix, optimal_assignment
+from scoring.score_sweep import sweep_parameters
+from scoring.score_kbest import k_best_assignments
+from scoring.score_soft import soft_assignment
+from scoring.score_flow import flow_assignment
 
 
 def build_observed_from_decoder(decoder: MoccaPeakDecoder, mzml_path: str, spectrum_tolerance_min: float = 0.2) -> List[Dict]:
@@ -113,24 +120,40 @@ def build_observed_from_decoder(decoder: MoccaPeakDecoder, mzml_path: str, spect
     return obs
 
 
-def build_predicted_from_reaction(reactants: List[str], solvent: str, conda_env: str = "uvvismlenv") -> List[Dict]:
-    """Use predictions to generate predicted descriptors for products: RT, λmax, and optionally MS (not implemented).
-    MS predictions are not available; its contribution will rely on future models.
+def build_predicted_from_reaction(
+    reactants: List[str],
+    solvent: str,
+    conda_env: str = "uvvismlenv",
+    ionization_profile: Optional[IonizationProfile] = None,
+    rt_backend: Optional[RTBackend] = None,
+    forward_backend: Optional[ForwardBackend] = None,
+) -> List[Dict]:
+    """Use predictions to generate predicted descriptors for products: RT, λmax, and MS.
+
+    MS spectra are the predicted adducts of each product expanded with their
+    isotope envelopes (see predict_ms_spectra), restricted to the adducts
+    possible under `ionization_profile` if one is given. Retention times come
+    from `rt_backend`, or the backend configured by PEAKPROPHET_RT_BACKEND;
+    products likewise come from `forward_backend` or PEAKPROPHET_FORWARD_BACKEND.
     """
     rxn = ChemicalReaction(reactants=reactants, solvents=solvent)
-    rxn.fetch_products_from_askcos_sync()
-    rxn.predict_products_retention_times_sync()
+    rxn.fetch_products_from_askcos_sync(backend=forward_backend)
+    rxn.predict_products_retention_times_sync(backend=rt_backend)
     rxn.predict_products_lambda_max(conda_env=conda_env)
+    rxn.predict_products_ms_adducts(profile=ionization_profile)
+
+    products = rxn.get_products()
+    spectra = predict_ms_spectra([p.get_smiles() for p in products], table=rxn.ms_adduct_table)
 
     preds: List[Dict] = []
-    for p in rxn.get_products():
+    for p, (mz, intensity) in zip(products, spectra):
         preds.append({
             "smiles": p.get_smiles(),
             "rt": p.get_retention_time(),
             "lmax": p.get_lambda_max(),
-            # Placeholder for MS prediction; leave empty arrays
-            "mz": np.array([]),
-            "intensity": np.array([]),
+            "lmax_std": p.get_lambda_max_std(),
+            "mz": mz,
+            "intensity": intensity,
         })
     return preds
 
@@ -145,31 +168,121 @@ def assign_compounds(
     ppm: Optional[float] = None,
     rt_sigma: float = 0.5,
     lmax_sigma: float = 15.0,
+    min_score: Optional[float] = None,
+    n_alternatives: int = 0,
+    soft: bool = False,
+    soft_epsilon: float = 0.1,
+    pred_capacity: Optional[int | List[int]] = None,
+    obs_capacity: Optional[int | List[int]] = None,
+    ionization_profile: Optional[IonizationProfile] = None,
+    rt_backend: Optional[RTBackend] = None,
+    forward_backend: Optional[ForwardBackend] = None,
 ) -> Dict:
     """Integrate pipeline: observed from decoding+MS, predicted from models; compute assignment.
 
+    Pairs scoring below `min_score` (if given) are left unassigned. If `n_alternatives`
+    is positive, the runner-up assignments are ranked as well (Murty's algorithm).
+    If `soft` is True, Sinkhorn matching probabilities are added to the result and
+    to each assignment record (if the marginals did not converge, a RuntimeWarning
+    is issued and the soft result's 'converged' flag is False). Setting
+    `pred_capacity` (peaks per product, e.g. for split peaks) or `obs_capacity`
+    (products per peak, for co-elution) switches to the many-to-one min-cost flow
+    assignment; the runner-up and soft assignments are one-to-one only, so
+    capacities cannot be combined with `n_alternatives` or `soft` (ValueError).
+    `ionization_profile` restricts the predicted adducts to those
+    possible under the run's ionization conditions. `rt_backend` and
+    `forward_backend` override the configured retention time and product
+    predictors.
     Returns a result dictionary with score matrix, assignment, and decorated records.
     """
+    capacities = pred_capacity is not None or obs_capacity is not None
+    if capacities and (n_alternatives > 0 or soft):
+        raise ValueError("n_alternatives and soft are one-to-one; they cannot be combined with pred_capacity or obs_capacity")
+
     obs = build_observed_from_decoder(decoder, mzml_path)
-    preds = build_predicted_from_reaction(reactants, solvent)
+    preds = build_predicted_from_reaction(reactants, solvent, ionization_profile=ionization_profile, rt_backend=rt_backend, forward_backend=forward_backend)
 
     S = build_score_matrix(preds, obs, weights=weights, mz_tol=mz_tol, ppm=ppm, rt_sigma=rt_sigma, lmax_sigma=lmax_sigma)
-    rows, cols, total = optimal_assignment(S)
+    if not capacities:
+        rows, cols, total = optimal_assignment(S, min_score=min_score)
+    else:
+        rows, cols, total = flow_assignment(
+            S,
+            pred_capacity=1 if pred_capacity is None else pred_capacity,
+            obs_capacity=1 if obs_capacity is None else obs_capacity,
+            min_score=min_score,
+        )
+
+    soft_result = None
+    if soft:
+        soft_result = soft_assignment(S, epsilon=soft_epsilon, unassigned_score=min_score or 0.0)
 
     assignments: List[Dict] = []
     for pi, oi in zip(rows, cols):
-        assignments.append({
+        record = {
             "pred_index": int(pi),
             "obs_index": int(oi),
             "score": float(S[pi, oi]),
             "pred": preds[pi],
             "obs": obs[oi],
-        })
+        }
+        if soft_result is not None:
+            record["probability"] = float(soft_result["probabilities"][pi, oi])
+        assignments.append(record)
+
+    alternatives: List[Dict] = []
+    if n_alternatives > 0:
+        ranked = k_best_assignments(S, k=n_alternatives + 1, min_score=min_score)
+        for alt_rows, alt_cols, alt_total in ranked[1:]:
+            alternatives.append({
+                "total_score": float(alt_total),
+                "pairs": [(int(pi), int(oi), float(S[pi, oi])) for pi, oi in zip(alt_rows, alt_cols)],
+            })
 
     return {
         "score_matrix": S,
         "assignments": assignments,
+        "alternatives": alternatives,
+        "soft_assignment": soft_result,
         "total_score": float(total),
         "predicted": preds,
         "observed": obs,
     }
+
+
+def sweep_assignment_parameters(
+    decoder: MoccaPeakDecoder,
+    mzml_path: str,
+    reactants: List[str],
+    solvent: str,
+    truth: Dict[int, int],
+    weight_grid: List[Dict[str, float]],
+    rt_sigmas: List[float],
+    lmax_sigmas: List[float],
+    mz_tol: float = 0.01,
+    ppm: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    ionization_profile: Optional[IonizationProfile] = None,
+    rt_backend: Optional[RTBackend] = None,
+    forward_backend: Optional[ForwardBackend] = None,
+) -> List[Dict]:
+    """Calibrate weights and kernel widths against an injection with known answers.
+
+    Observed and predicted descriptors are built once; every grid setting is then
+    scored in one batched pass (see scoring.score_sweep.sweep_parameters).
+    `truth` maps pred_index -> obs_index. Pass the same `ionization_profile` as
+    to assign_compounds so the calibration scores the same predicted spectra.
+    """
+    obs = build_observed_from_decoder(decoder, mzml_path)
+    preds = build_predicted_from_reaction(reactants, solvent, ionization_profile=ionization_profile, rt_backend=rt_backend, forward_backend=forward_backend)
+    return sweep_parameters(
+        preds,
+        obs,
+        truth,
+        weight_grid=weight_grid,
+        rt_sigmas=rt_sigmas,
+        lmax_sigmas=lmax_sigmas,
+        mz_tol=mz_tol,
+        ppm=ppm,
+        max_workers=max_workers,
+    )
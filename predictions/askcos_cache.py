@@ -0,0 +1,59 @@
+"""
+ASKCOS Forward Prediction Cache
+
+Persistent SQLite cache of ASKCOS forward prediction results keyed by the
+reaction: canonical reactant SMILES (sorted, so reactant order does not matter)
+plus canonical solvent SMILES. A reaction that was already scraped returns its
+product list without starting a browser. Entries expire after a time-to-live
+(ASKCOS models are updated over time) and can be invalidated by bumping the
+version.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+try:
+    from predictions.mol_cache import canonical_smiles
+    from predictions.sqlite_cache import SQLiteCache, default_cache_path
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import canonical_smiles
+    from sqlite_cache import SQLiteCache, default_cache_path
+
+# Seconds cached reactions stay valid (default 30 days).
+DEFAULT_TTL = float(os.environ.get("PEAKPROPHET_ASKCOS_CACHE_TTL", str(30 * 24 * 3600)))
+
+
+def reaction_key(reactant_smiles_list: List[str], solvent_smiles: str) -> str:
+    """Order-independent key of canonical reactant fragments and the canonical solvent."""
+    fragments = []
+    for smiles in reactant_smiles_list:
+        fragments.extend((canonical_smiles(smiles) or smiles).split("."))
+    solvent = canonical_smiles(solvent_smiles) or solvent_smiles
+    return f"{'.'.join(sorted(fragments))}|{solvent}"
+
+
+class AskcosCache:
+    """ASKCOS result lists ([{"smiles", "probability", "mol_weight"}]) keyed by reaction."""
+    def __init__(self, path: Optional[str] = None, version: str = "1", ttl: Optional[float] = DEFAULT_TTL):
+        self.store = SQLiteCache(path or default_cache_path("askcos.sqlite"), table="forward_predictions", version=version, ttl=ttl)
+
+    def get(self, reactant_smiles_list: List[str], solvent_smiles: str) -> Optional[List[Dict]]:
+        """Cached results of the reaction, or None on a miss."""
+        return self.store.get(reaction_key(reactant_smiles_list, solvent_smiles))
+
+    def set(self, reactant_smiles_list: List[str], solvent_smiles: str, results: List[Dict]):
+        self.store.set(reaction_key(reactant_smiles_list, solvent_smiles), results)
+
+    def __repr__(self):
+        return f"AskcosCache({self.store})"
+
+
+_default_cache: Optional[AskcosCache] = None
+
+
+def get_default_askcos_cache() -> AskcosCache:
+    """Process-wide cache in the default cache directory, created on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AskcosCache()
+    return _default_cache
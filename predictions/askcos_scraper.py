@@ -1,120 +1,331 @@
 import asyncio
-import os
 import csv
-from rdkit import Chem
-from rdkit.Chem import Descriptors
+import io
+import os
 from playwright.async_api import async_playwright
 
-async def scrape_askcos(reactant_smiles_list, solvent_smiles):
+try:
+    from predictions.mol_cache import exact_mass
+    from predictions.askcos_cache import get_default_askcos_cache, reaction_key
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import exact_mass
+    from askcos_cache import get_default_askcos_cache, reaction_key
+
+ASKCOS_FORWARD_URL = "https://askcos.mit.edu/forward"
+# Results are ready once a product row of the results table renders (not the
+# data table's loading or "no data" placeholder, which span a single cell); the
+# forward prediction API response is only watched to fail fast on an error.
+RESULTS_SELECTOR = os.environ.get(
+    "PEAKPROPHET_ASKCOS_RESULTS_SELECTOR",
+    "table tbody tr:not(.v-data-table__empty-wrapper):not(.v-data-table__progress)",
+)
+FORWARD_RESPONSE_PATTERN = os.environ.get("PEAKPROPHET_ASKCOS_RESPONSE_PATTERN", "/api/forward")
+# Timeout of each page interaction, of the wait for results, and of the whole scrape.
+STEP_TIMEOUT_MS = float(os.environ.get("PEAKPROPHET_ASKCOS_STEP_TIMEOUT_MS", "20000"))
+RESULTS_TIMEOUT_MS = float(os.environ.get("PEAKPROPHET_ASKCOS_RESULTS_TIMEOUT_MS", "120000"))
+DEADLINE_S = float(os.environ.get("PEAKPROPHET_ASKCOS_DEADLINE_S", "180"))
+# Pages (concurrent reactions) of the shared browser used by scrape_askcos_batch.
+DEFAULT_PAGES = int(os.environ.get("PEAKPROPHET_ASKCOS_PAGES", "4"))
+
+async def scrape_askcos(reactant_smiles_list, solvent_smiles, use_cache=True, cache=None):
+    """
+    ASKCOS forward prediction results for given reactants and solvent, served
+    from the persistent reaction cache when available.
+
+    Args:
+        reactant_smiles_list (list): List of reactant SMILES strings
+        solvent_smiles (str): Solvent SMILES string
+        use_cache (bool): Whether to read from and write to the persistent cache
+        cache (AskcosCache): Cache to use (default: the process-wide cache)
+
+    Returns:
+        list: {"smiles", "probability", "mol_weight"} dictionaries
+    """
+    if not use_cache:
+        return await _scrape_uncached(reactant_smiles_list, solvent_smiles)
+    cache = cache or get_default_askcos_cache()
+    results = cache.get(reactant_smiles_list, solvent_smiles)
+    if results is not None:
+        print("Served ASKCOS results from cache")
+        return results
+    results = await _scrape_uncached(reactant_smiles_list, solvent_smiles)
+    _cache_results(cache, reactant_smiles_list, solvent_smiles, results)
+    return results
+
+def has_product_rows(results, reactant_smiles_list):
+    """Whether results hold at least one predicted product after the reactant and solvent rows."""
+    for row in results[len(reactant_smiles_list) + 1:]:
+        try:
+            float(row["probability"])
+        except (KeyError, TypeError, ValueError):
+            continue  # e.g. the exported CSV header
+        return True
+    return False
+
+def _cache_results(cache, reactant_smiles_list, solvent_smiles, results):
+    """Cache a scrape unless it came back without products (e.g. an empty or truncated export)."""
+    if not has_product_rows(results, reactant_smiles_list):
+        print(f"Not caching ASKCOS results without products for {'.'.join(reactant_smiles_list)} in {solvent_smiles}")
+        return
+    cache.set(reactant_smiles_list, solvent_smiles, results)
+
+async def _scrape_uncached(reactant_smiles_list, solvent_smiles, step_timeout_ms=STEP_TIMEOUT_MS, results_timeout_ms=RESULTS_TIMEOUT_MS, deadline_s=DEADLINE_S):
     """
     Scrape ASKCOS forward prediction results for given reactants and solvent.
-    
+
+    Launches a headless Chromium session for this one reaction; the whole
+    scrape is bounded by deadline_s seconds (asyncio.TimeoutError otherwise).
+
     Args:
         reactant_smiles_list (list): List of reactant SMILES strings
         solvent_smiles (str): Solvent SMILES string
-        output_filename (str): Name of the output CSV file (default: "forward.csv")
-    
+        step_timeout_ms (float): Timeout of each page interaction
+        results_timeout_ms (float): Timeout waiting for ASKCOS to return results
+        deadline_s (float): Overall time limit of the scrape
+
     Returns:
-        str: Path to the downloaded CSV file
+        list: {"smiles", "probability", "mol_weight"} dictionaries
+    """
+    async def scrape():
+        async with async_playwright() as p:
+            # Launch Chromium headless browser
+            browser = await p.chromium.launch(headless=True)  # set True for headless
+            try:
+                page = await browser.new_page(accept_downloads=True)
+                return await scrape_askcos_on_page(page, reactant_smiles_list, solvent_smiles, step_timeout_ms, results_timeout_ms)
+            finally:
+                await browser.close()
+
+    return await asyncio.wait_for(scrape(), deadline_s)
+
+# True once a visible row matching the selector has more than one cell.
+_PRODUCT_ROWS_RENDERED = """(selector) => Array.from(document.querySelectorAll(selector)).some(
+    row => row.offsetParent !== null && row.querySelectorAll('td').length > 1 && !row.querySelector('td[colspan]')
+)"""
+
+def _is_results_response(response):
+    return FORWARD_RESPONSE_PATTERN in response.url and response.request.method == "POST"
+
+async def scrape_askcos_on_page(page, reactant_smiles_list, solvent_smiles, step_timeout_ms=STEP_TIMEOUT_MS, results_timeout_ms=RESULTS_TIMEOUT_MS):
+    """
+    Run one forward prediction on an open page and read the exported CSV in memory.
+
+    Every step waits for the element or event it depends on instead of
+    sleeping: results are ready when a product row of the results table
+    renders. An error status on the forward prediction API response aborts
+    the wait early.
     """
     # Join reactant SMILES with periods
     combined_reactants = ".".join(reactant_smiles_list)
     print(f"Combined reactants: {combined_reactants}")
 
-    async with async_playwright() as p:
-        # Launch Chromium headless browser
-        browser = await p.chromium.launch(headless=True)  # set True for headless
-        page = await browser.new_page()
-
-        # Navigate to ASKCOS forward prediction page
-        print("Navigating to ASKCOS forward page...")
-        await page.goto("https://askcos.mit.edu/forward", wait_until="networkidle")
-
-        # Wait for the button by text content using a locator
-        print("Navigating to Product Prediction tab...")
-        product_button = page.locator("button", has_text="Product Prediction")
-        await product_button.wait_for(timeout=20000)  # waits up to 20s
-        await product_button.click()
-        print("Clicked Product Prediction tab")
-
-        # Fill Reactants
-        print("Navigating to Reactants tab")
-        reactant_input = page.locator("input[placeholder='SMILES'][id^='input-']")
-        await reactant_input.first.fill(combined_reactants)
-        print("Entered Reactants")
-
-        # Fill Solvents
-        print("Navigating to Solvents tab")
-        reactant_input = page.locator("input[placeholder='SMILES'][id^='input-']")
-        await reactant_input.nth(2).fill(solvent_smiles)
-        print("Entered Solvents")
-
-        # Click "Get Results" button
-        print("Navigating to Results button...")
-        get_results_button = page.locator("button:has-text('Get Results')")
-        await get_results_button.click()
-        print("Clicked Get Results button")
+    # Navigate to ASKCOS forward prediction page
+    print("Navigating to ASKCOS forward page...")
+    await page.goto(ASKCOS_FORWARD_URL, wait_until="domcontentloaded", timeout=step_timeout_ms)
 
-        await asyncio.sleep(10)
+    # Wait for the button by text content using a locator
+    print("Navigating to Product Prediction tab...")
+    product_button = page.locator("button", has_text="Product Prediction")
+    await product_button.wait_for(timeout=step_timeout_ms)
+    await product_button.click()
+    print("Clicked Product Prediction tab")
 
-        print("Navigating to Export button...")
-        get_results_button = page.locator("button:has-text('Export')")
-        await get_results_button.click()
-        print("Clicked Export button")
+    # Fill Reactants and Solvents
+    smiles_inputs = page.locator("input[placeholder='SMILES'][id^='input-']")
+    await smiles_inputs.first.wait_for(timeout=step_timeout_ms)
+    await smiles_inputs.first.fill(combined_reactants)
+    print("Entered Reactants")
+    await smiles_inputs.nth(2).fill(solvent_smiles)
+    print("Entered Solvents")
 
-        # Set up download path to your script folder
-        download_path = os.path.dirname(os.path.abspath(__file__))
+    # Click "Get Results" and wait for the results to arrive
+    response_task = asyncio.ensure_future(page.wait_for_event("response", predicate=_is_results_response, timeout=results_timeout_ms))
+    table_task = asyncio.ensure_future(page.wait_for_function(_PRODUCT_ROWS_RENDERED, arg=RESULTS_SELECTOR, timeout=results_timeout_ms))
+    try:
+        await page.locator("button:has-text('Get Results')").click(timeout=step_timeout_ms)
+        print("Clicked Get Results button")
+        pending = {response_task, table_task}
+        while not table_task.done():
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if response_task in done and response_task.exception() is None and not response_task.result().ok:
+                response = response_task.result()
+                raise RuntimeError(f"ASKCOS forward prediction failed: HTTP {response.status} from {response.url}")
+        table_task.result()
+    finally:
+        for task in (response_task, table_task):
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(response_task, table_task, return_exceptions=True)
+    print("Results received")
 
-        # Listen for download event
-        async with page.expect_download() as download_info:
-            get_results_button = page.locator("button:has-text('Save')")
-            await get_results_button.click()
-        download = await download_info.value
+    export_button = page.locator("button:has-text('Export')")
+    await export_button.click(timeout=results_timeout_ms)
+    print("Clicked Export button")
 
-        # Save to desired location
-        dest_file = os.path.join(download_path, "forward.csv")
-        await download.save_as(dest_file)
-        print(f"Downloaded CSV saved to {dest_file}")
+    # Capture the download and read it from Playwright's temporary file
+    async with page.expect_download(timeout=step_timeout_ms) as download_info:
+        await page.locator("button:has-text('Save')").click(timeout=step_timeout_ms)
+    download = await download_info.value
+    path = await download.path()
+    with open(path, "r", newline="") as file:
+        content = file.read()
+    await download.delete()
+    print(f"Downloaded {len(content)} bytes of results")
 
-        await asyncio.sleep(5)
+    return parse_forward_csv(content, reactant_smiles_list, solvent_smiles)
 
-        results = []
+def parse_forward_csv(content, reactant_smiles_list, solvent_smiles):
+    """Reactants, solvent and exported ASKCOS product rows as {"smiles", "probability", "mol_weight"} dictionaries."""
+    results = []
 
-        for smiles in reactant_smiles_list:
-            mol_reactant = Chem.MolFromSmiles(smiles)
-            mw_reactant = Descriptors.ExactMolWt(mol_reactant)
-            results.append({
-                "smiles": smiles,
-                "probability": 1,
-                "mol_weight": mw_reactant,
-            })
+    for smiles in reactant_smiles_list:
+        mw_reactant = exact_mass(smiles)
+        results.append({
+            "smiles": smiles,
+            "probability": 1,
+            "mol_weight": mw_reactant,
+        })
 
-        mol_solvent = Chem.MolFromSmiles(solvent_smiles)
-        mw_solvent = Descriptors.ExactMolWt(mol_solvent)
+    mw_solvent = exact_mass(solvent_smiles)
+    results.append({
+            "smiles": solvent_smiles,
+            "probability": 1,
+            "mol_weight": mw_solvent,
+        })
+
+    reader = csv.reader(io.StringIO(content))
+    for row in reader:
         results.append({
-                "smiles": solvent_smiles,
-                "probability": 1,
-                "mol_weight": mw_solvent,
-            })
-
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_file = os.path.join(script_dir, "forward.csv")
-        with open(csv_file, "r") as file:
-            reader = csv.reader(file)
-            for row in reader:
-                results.append({
-                    "smiles": row[1],
-                    "probability": row[2],
-                    "mol_weight": row[4],
-                })
-
-        if os.path.exists(csv_file):
-            os.remove(csv_file)
-            print(f"Deleted file: {csv_file}")
-        else:
-            print(f"File not found: {csv_file}")
+            "smiles": row[1],
+            "probability": row[2],
+            "mol_weight": row[4],
+        })
 
-        return results
+    return results
+
+async def scrape_askcos_batch(reactions, max_pages=DEFAULT_PAGES, use_cache=True, cache=None, step_timeout_ms=STEP_TIMEOUT_MS, results_timeout_ms=RESULTS_TIMEOUT_MS, deadline_s=DEADLINE_S):
+    """
+    Scrape many reactions with one shared browser, yielding each result as it completes.
+
+    Cached reactions are yielded first; identical reactions are scraped once.
+    The remaining reactions run on up to max_pages pages of a single Chromium
+    instance, each bounded by deadline_s. A page whose scrape fails is replaced
+    before it takes the next reaction.
+
+    Args:
+        reactions (list): (reactant SMILES list, solvent SMILES) tuples
+        max_pages (int): Maximum number of reactions scraped concurrently
+        use_cache (bool): Whether to read from and write to the persistent cache
+        cache (AskcosCache): Cache to use (default: the process-wide cache)
+
+    Yields:
+        dict: {"index", "reactants", "solvent", "results", "error"} per input
+        reaction, in completion order ("results" is None when "error" is set)
+    """
+    if max_pages < 1:
+        raise ValueError("max_pages must be at least 1")
+    reactions = [(list(reactants), solvent) for reactants, solvent in reactions]
+    if use_cache:
+        cache = cache or get_default_askcos_cache()
+
+    def outcome(index, results, error=None):
+        reactants, solvent = reactions[index]
+        return {"index": index, "reactants": reactants, "solvent": solvent, "results": results, "error": error}
+
+    # Group inputs by reaction so duplicates share one scrape.
+    groups = {}
+    for index, (reactants, solvent) in enumerate(reactions):
+        groups.setdefault(reaction_key(reactants, solvent), []).append(index)
+
+    todo = []
+    for indices in groups.values():
+        reactants, solvent = reactions[indices[0]]
+        results = cache.get(reactants, solvent) if use_cache else None
+        if results is None:
+            todo.append(indices)
+            continue
+        for index in indices:
+            yield outcome(index, results)
+    if not todo:
+        return
+    print(f"Scraping {len(todo)} reactions on {min(max_pages, len(todo))} pages")
+
+    jobs = asyncio.Queue()
+    for indices in todo:
+        jobs.put_nowait(indices)
+    finished = asyncio.Queue()
+
+    async def worker(browser):
+        page = await browser.new_page(accept_downloads=True)
+        try:
+            while True:
+                try:
+                    indices = jobs.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                reactants, solvent = reactions[indices[0]]
+                try:
+                    results = await asyncio.wait_for(
+                        scrape_askcos_on_page(page, reactants, solvent, step_timeout_ms, results_timeout_ms), deadline_s
+                    )
+                except Exception as e:
+                    print(f"ASKCOS scrape failed for {'.'.join(reactants)} in {solvent}: {e!r}")
+                    await finished.put((indices, None, repr(e)))
+                    # Start the next reaction on a clean page.
+                    await page.close()
+                    page = await browser.new_page(accept_downloads=True)
+                    continue
+                if use_cache:
+                    _cache_results(cache, reactants, solvent, results)
+                await finished.put((indices, results, None))
+        finally:
+            await page.close()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        workers = [asyncio.ensure_future(worker(browser)) for _ in range(min(max_pages, len(todo)))]
+        all_workers = asyncio.gather(*workers, return_exceptions=True)
+
+        async def next_finished():
+            """Next finished reaction, or None once every worker has stopped with nothing left."""
+            while finished.empty():
+                if all_workers.done():
+                    return None
+                getter = asyncio.ensure_future(finished.get())
+                await asyncio.wait([getter, all_workers], return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    return getter.result()
+                getter.cancel()
+            return finished.get_nowait()
+
+        try:
+            for _ in range(len(todo)):
+                item = await next_finished()
+                # Stop early if every worker died (e.g. the browser crashed).
+                if item is None:
+                    errors = [e for e in all_workers.result() if isinstance(e, BaseException)]
+                    raise RuntimeError(f"ASKCOS browser workers stopped: {errors[0] if errors else 'no results'}")
+                indices, results, error = item
+                for index in indices:
+                    yield outcome(index, results, error)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await browser.close()
+
+async def scrape_askcos_many(reactions, max_pages=DEFAULT_PAGES, use_cache=True, cache=None):
+    """
+    Results of scrape_askcos_batch collected in input order.
+
+    Returns:
+        list: Result list per reaction (None where the scrape failed)
+    """
+    reactions = list(reactions)
+    results = [None] * len(reactions)
+    async for item in scrape_askcos_batch(reactions, max_pages=max_pages, use_cache=use_cache, cache=cache):
+        results[item["index"]] = item["results"]
+    return results
 
 async def main():
     """Example usage of the scrape_askcos function"""
@@ -0,0 +1,229 @@
+"""
+Forward Reaction Prediction Backends
+
+Candidate products can come from the ASKCOS web server or from offline
+stand-ins that need no network access: a table of RDKit reaction templates
+applied locally, or a store of recorded ASKCOS responses replayed by reaction.
+All implement ForwardBackend and return the {"smiles", "probability",
+"mol_weight"} dictionaries consumed by ChemicalReaction.fetch_products_from_askcos
+(reactants and solvent first with probability 1, then the products). The
+backend is chosen with get_forward_backend(), from an explicit name or the
+PEAKPROPHET_FORWARD_BACKEND environment variable ("askcos" by default,
+"template" or "recorded", with PEAKPROPHET_FORWARD_DATA pointing to the
+template CSV or recorded JSON store).
+"""
+
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from itertools import product as cartesian_product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from rdkit import Chem
+from rdkit.Chem import AllChem
+
+try:
+    from predictions.mol_cache import canonical_smiles, exact_mass
+    from predictions.askcos_cache import reaction_key
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import canonical_smiles, exact_mass
+    from askcos_cache import reaction_key
+
+# (name, reaction SMARTS, probability) of common transformations, used when no
+# template table is given. Probabilities are rough priors, not ASKCOS scores.
+DEFAULT_TEMPLATES = (
+    ("anhydride_alcoholysis", "[C:1](=[O:2])[O:6][C:3]=[O:4].[OX2H1;!$(OC=O):5][#6:7]>>[C:1](=[O:2])[O:5][#6:7].[OH:6][C:3]=[O:4]", 0.6),
+    ("anhydride_aminolysis", "[C:1](=[O:2])[O:6][C:3]=[O:4].[NX3;H2,H1;!$(NC=O):5]>>[C:1](=[O:2])[N:5].[OH:6][C:3]=[O:4]", 0.7),
+    ("acyl_chloride_alcoholysis", "[C:1](=[O:2])Cl.[OX2H1;!$(OC=O):5][#6:7]>>[C:1](=[O:2])[O:5][#6:7]", 0.6),
+    ("acyl_chloride_aminolysis", "[C:1](=[O:2])Cl.[NX3;H2,H1;!$(NC=O):5]>>[C:1](=[O:2])[N:5]", 0.7),
+    ("anhydride_hydrolysis", "[C:1](=[O:2])[O:6][C:3]=[O:4].[OX2H2:5]>>[C:1](=[O:2])[OH:5].[OH:6][C:3]=[O:4]", 0.3),
+    ("ester_hydrolysis", "[C:1](=[O:2])[O:3][CX4:4].[OX2H2:5]>>[C:1](=[O:2])[OH:5].[OH:3][C:4]", 0.1),
+    ("fischer_esterification", "[C:1](=[O:2])[OX2H1].[OX2H1;!$(OC=O):5][CX4:7]>>[C:1](=[O:2])[O:5][C:7]", 0.2),
+)
+
+
+class ForwardBackend(ABC):
+    """Interface of forward reaction predictors."""
+    name = "base"
+
+    @abstractmethod
+    async def predict(self, reactant_smiles_list: List[str], solvent_smiles: str) -> List[Dict]:
+        """Reactants, solvent and predicted products as {"smiles", "probability", "mol_weight"} dictionaries."""
+        raise NotImplementedError
+
+
+def _context_entries(reactant_smiles_list: List[str], solvent_smiles: str) -> List[Dict]:
+    """Reactants and solvent with probability 1, as listed first by the ASKCOS scraper."""
+    return [
+        {"smiles": smiles, "probability": 1, "mol_weight": exact_mass(smiles)}
+        for smiles in list(reactant_smiles_list) + [solvent_smiles]
+    ]
+
+
+class AskcosWebBackend(ForwardBackend):
+    """Predictions scraped from askcos.mit.edu (see askcos_scraper.scrape_askcos)."""
+    name = "askcos"
+
+    def __init__(self, use_cache: bool = True):
+        self.use_cache = use_cache
+
+    async def predict(self, reactant_smiles_list: List[str], solvent_smiles: str) -> List[Dict]:
+        # Imported here so the offline backends work without playwright installed.
+        try:
+            from predictions.askcos_scraper import scrape_askcos
+        except ImportError:  # pragma: no cover - fallback for direct execution
+            from askcos_scraper import scrape_askcos
+        return await scrape_askcos(reactant_smiles_list, solvent_smiles, use_cache=self.use_cache)
+
+    def __repr__(self):
+        return f"AskcosWebBackend(use_cache={self.use_cache})"
+
+
+class TemplateForwardBackend(ForwardBackend):
+    """
+    Products from a table of RDKit reaction templates applied locally.
+
+    Every template is run on every assignment of reactant and solvent
+    fragments to its reactant slots (so solvolysis templates can use the
+    solvent). A product's probability is the highest probability of the
+    templates producing it.
+
+    Parameters
+    ----------
+    templates : Sequence[Tuple[str, str, float]]
+        (name, reaction SMARTS, probability) rows
+    """
+    name = "template"
+
+    def __init__(self, templates: Sequence[Tuple[str, str, float]] = DEFAULT_TEMPLATES):
+        self.templates = []
+        for name, smarts, probability in templates:
+            reaction = AllChem.ReactionFromSmarts(smarts)
+            if reaction is None or reaction.GetNumReactantTemplates() == 0:
+                raise ValueError(f"Invalid reaction template '{name}': {smarts}")
+            reaction.Initialize()
+            self.templates.append((name, reaction, float(probability)))
+
+    @classmethod
+    def from_csv(cls, path: str) -> "TemplateForwardBackend":
+        """Templates from a CSV with 'smarts' and 'probability' columns (and optionally 'name')."""
+        with open(path, newline="") as f:
+            rows = [(row.get("name") or f"template_{i}", row["smarts"], float(row["probability"])) for i, row in enumerate(csv.DictReader(f))]
+        return cls(rows)
+
+    def predict_products(self, reactant_smiles_list: List[str], solvent_smiles: str) -> Dict[str, float]:
+        """{canonical product SMILES: probability} for the reaction."""
+        inputs = set()
+        mols = []
+        for smiles in list(reactant_smiles_list) + [solvent_smiles]:
+            for fragment in (canonical_smiles(smiles) or smiles).split("."):
+                mol = Chem.MolFromSmiles(fragment)
+                if mol is not None and fragment not in inputs:
+                    inputs.add(fragment)
+                    mols.append(mol)
+
+        products: Dict[str, float] = {}
+        for _, reaction, probability in self.templates:
+            for combo in cartesian_product(mols, repeat=reaction.GetNumReactantTemplates()):
+                for outcome in reaction.RunReactants(combo):
+                    for mol in outcome:
+                        smiles = _sanitized_smiles(mol)
+                        if smiles is None or smiles in inputs:
+                            continue
+                        products[smiles] = max(probability, products.get(smiles, 0.0))
+        return products
+
+    async def predict(self, reactant_smiles_list: List[str], solvent_smiles: str) -> List[Dict]:
+        results = _context_entries(reactant_smiles_list, solvent_smiles)
+        ranked = sorted(self.predict_products(reactant_smiles_list, solvent_smiles).items(), key=lambda item: -item[1])
+        for smiles, probability in ranked:
+            results.append({"smiles": smiles, "probability": probability, "mol_weight": exact_mass(smiles)})
+        return results
+
+    def __repr__(self):
+        return f"TemplateForwardBackend(templates={len(self.templates)})"
+
+
+def _sanitized_smiles(mol) -> Optional[str]:
+    try:
+        Chem.SanitizeMol(mol)
+    except Exception:
+        return None
+    return canonical_smiles(Chem.MolToSmiles(mol))
+
+
+class RecordedForwardBackend(ForwardBackend):
+    """
+    Replays recorded forward prediction responses, keyed by reaction.
+
+    The store is a JSON object mapping askcos_cache.reaction_key() to result
+    lists; record() and save() build one, e.g. from a live ASKCOS run.
+    Reactions missing from the store go to `fallback` if one is given and
+    raise KeyError otherwise.
+    """
+    name = "recorded"
+
+    def __init__(self, responses: Optional[Dict[str, List[Dict]]] = None, fallback: Optional[ForwardBackend] = None):
+        self.responses: Dict[str, List[Dict]] = dict(responses or {})
+        self.fallback = fallback
+
+    @classmethod
+    def load(cls, path: str, fallback: Optional[ForwardBackend] = None) -> "RecordedForwardBackend":
+        with open(path) as f:
+            return cls(json.load(f), fallback=fallback)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.responses, f)
+
+    def record(self, reactant_smiles_list: List[str], solvent_smiles: str, results: List[Dict]):
+        self.responses[reaction_key(reactant_smiles_list, solvent_smiles)] = results
+
+    async def predict(self, reactant_smiles_list: List[str], solvent_smiles: str) -> List[Dict]:
+        key = reaction_key(reactant_smiles_list, solvent_smiles)
+        if key in self.responses:
+            return self.responses[key]
+        if self.fallback is not None:
+            return await self.fallback.predict(reactant_smiles_list, solvent_smiles)
+        raise KeyError(f"No recorded forward prediction for {key}")
+
+    def __repr__(self):
+        return f"RecordedForwardBackend(reactions={len(self.responses)})"
+
+
+def get_forward_backend(name: Optional[str] = None, data_path: Optional[str] = None, use_cache: bool = True) -> ForwardBackend:
+    """
+    Forward prediction backend by name ("askcos", "template" or "recorded").
+
+    Defaults to $PEAKPROPHET_FORWARD_BACKEND (or "askcos"). The template backend
+    reads its table from data_path or $PEAKPROPHET_FORWARD_DATA (built-in
+    templates if unset); the recorded backend requires a JSON store there.
+    """
+    name = (name or os.environ.get("PEAKPROPHET_FORWARD_BACKEND", "askcos")).lower()
+    data_path = data_path or os.environ.get("PEAKPROPHET_FORWARD_DATA")
+    if name == "askcos":
+        return AskcosWebBackend(use_cache=use_cache)
+    if name == "template":
+        return _load_template_backend(os.path.abspath(data_path)) if data_path else _default_template_backend()
+    if name == "recorded":
+        if not data_path:
+            raise ValueError("The recorded forward backend needs a response store (PEAKPROPHET_FORWARD_DATA)")
+        return _load_recorded_backend(os.path.abspath(data_path))
+    raise ValueError(f"Unknown forward backend: {name}")
+
+
+@lru_cache(maxsize=1)
+def _default_template_backend() -> TemplateForwardBackend:
+    return TemplateForwardBackend()
+
+
+@lru_cache(maxsize=8)
+def _load_template_backend(path: str) -> TemplateForwardBackend:
+    return TemplateForwardBackend.from_csv(path)
+
+
+@lru_cache(maxsize=8)
+def _load_recorded_backend(path: str) -> RecordedForwardBackend:
+    return RecordedForwardBackend.load(path)
@@ -0,0 +1,210 @@
+"""
+Asynchronous Job Queue for the Prediction Services
+
+Lets the FastAPI services accept a prediction, return a job id immediately and
+run the work in a bounded pool off the event loop. Coroutine jobs run on the
+loop under a concurrency limit; blocking jobs (e.g. chemprop subprocesses) run
+in a thread pool of the same size. Jobs are de-duplicated by a hash of their
+input, so identical submissions share one job, and finished jobs are kept for a
+time-to-live so clients can poll or stream their results. run() uses the same
+pool for work whose result is consumed right away and should not be kept.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def input_hash(payload: Any) -> str:
+    """Stable SHA-256 of a JSON-serializable job input."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class Job:
+    """State of one submitted job."""
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def _set_status(self, status: str):
+        self.status = status
+        # Wake everyone waiting for a change and start a fresh event for the next one.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.status == DONE:
+            data["result"] = self.result
+        return data
+
+    def __repr__(self):
+        return f"Job(id='{self.id}', status='{self.status}')"
+
+
+class JobQueue:
+    """
+    Bounded pool of de-duplicated background jobs.
+
+    Parameters
+    ----------
+    max_workers : int
+        Maximum number of jobs running at once
+    ttl : float
+        Seconds finished jobs are kept for polling
+    """
+    def __init__(self, max_workers: int = 2, ttl: float = 3600.0):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[str, Job] = {}
+        self._tasks = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, payload: Any, func: Callable, *args, **kwargs) -> Job:
+        """
+        Queue func(*args, **kwargs) unless a job with the same payload is queued,
+        running or done; returns the (possibly existing) job.
+
+        Coroutine functions are awaited on the event loop; plain functions run in
+        the worker thread pool.
+        """
+        self._prune()
+        key = input_hash(payload)
+        existing = self._by_key.get(key)
+        if existing is not None and existing.status != FAILED:
+            return existing
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        job = Job(key)
+        self._jobs[job.id] = job
+        self._by_key[key] = job
+        task = asyncio.ensure_future(self._run(job, func, args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) in the bounded pool and return its result.
+
+        Unlike submit(), nothing is recorded: there is no job id, no
+        de-duplication, and the result is not kept once returned.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        async with self._slots:
+            return await self._call(func, args, kwargs)
+
+    async def _call(self, func: Callable, args, kwargs) -> Any:
+        if asyncio.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def _run(self, job: Job, func: Callable, args, kwargs):
+        async with self._slots:
+            job.started = time.time()
+            job._set_status(RUNNING)
+            try:
+                job.result = await self._call(func, args, kwargs)
+                status = DONE
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                status = FAILED
+            job.finished = time.time()
+            job._set_status(status)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id, or None if unknown or expired."""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: Optional[float] = None) -> Job:
+        """Wait until the job has finished (or the timeout elapses)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not job.done:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(job._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return job
+
+    async def events(self, job: Job, heartbeat: float = 15.0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the job state on every status change (and every heartbeat seconds) until it finishes."""
+        while True:
+            yield job.to_dict()
+            if job.done:
+                return
+            changed = job._changed
+            try:
+                await asyncio.wait_for(changed.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                pass
+
+    async def sse(self, job: Job, heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """events() formatted as server-sent events (for a text/event-stream response)."""
+        async for state in self.events(job, heartbeat=heartbeat):
+            yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+
+    def _prune(self):
+        """Forget finished jobs older than the time-to-live."""
+        cutoff = time.time() - self.ttl
+        expired = [job for job in self._jobs.values() if job.done and job.finished < cutoff]
+        for job in expired:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of known jobs per status."""
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    async def shutdown(self):
+        """Wait for running jobs and stop the thread pool."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
@@ -1,15 +1,27 @@
 import os
-import shutil
+import json
+import asyncio
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
-from typing import List, Tuple, Dict
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Tuple, Dict, Iterator
+import numpy as np
 import pandas as pd
+import shutil
 import subprocess
 import logging
 import tempfile
 
+try:
+    from predictions.job_queue import JobQueue
+except Exception:  # pragma: no cover - fallback for direct execution
+    from job_queue import JobQueue
+
 app = FastAPI()
 
+# Chemprop runs block, so every prediction goes through this bounded worker
+# pool instead of running on the event loop.
+job_queue = JobQueue(max_workers=int(os.environ.get("PEAKPROPHET_JOB_WORKERS", "2")))
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -45,14 +57,17 @@ def run_chemprop_prediction(input_file: str, output_file: str):
         logger.error(f"stderr: {e.stderr}")
         return False
 
+# Rows per chunk when reading results and streaming uploads
+CHUNKSIZE = int(os.environ.get("PEAKPROPHET_LMAX_CHUNKSIZE", "10000"))
+
 def extract_predictions(results_file: str) -> Dict[Tuple[str, str], float]:
     try:
-        df = pd.read_csv(results_file)
-        logger.info(f"Read results file: {results_file}")
-
         predictions = {}
-        for _, row in df.iterrows():
-            predictions[(row['smiles'], row['solvent'])] = row['peakwavs_max']
+        # Only the needed columns, typed, chunk by chunk; built from column arrays.
+        for chunk in pd.read_csv(results_file, usecols=['smiles', 'solvent', 'peakwavs_max'], dtype={'smiles': str, 'solvent': str}, chunksize=CHUNKSIZE):
+            values = pd.to_numeric(chunk['peakwavs_max'], errors='coerce').to_numpy(dtype=float)
+            predictions.update(zip(zip(chunk['smiles'].tolist(), chunk['solvent'].tolist()), values.tolist()))
+        logger.info(f"Read results file: {results_file}")
         return predictions
     except Exception as e:
         logger.error(f"Error extracting predictions: {e}")
@@ -70,37 +85,146 @@ def predict_lambda_max(smiles_solvent_tuples: List[Tuple[str, str]]) -> Dict[Tup
 
         return extract_predictions(output_file)
 
-@app.get("/")
-async def root():
-    return {"message": "Lambda Max Prediction API is running! Use POST /predict_lambda_max with CSV file."}
+def run_prediction(smiles_solvent_list: List[Tuple[str, str]]) -> dict:
+    predictions = predict_lambda_max(smiles_solvent_list)
+    if not predictions:
+        raise RuntimeError("Prediction failed")
+    return {
+        "predictions": [
+            {"smiles": k[0], "solvent": k[1], "lambda_max": v if np.isfinite(v) else None}
+            for k, v in predictions.items()
+        ]
+    }
 
-@app.post("/predict_lambda_max")
-async def predict_lambda_max_api(file: UploadFile = File(...)):
+def _read_input_chunks(file: UploadFile) -> Iterator[pd.DataFrame]:
+    """Chunks of the uploaded CSV with only the typed smiles and solvent columns."""
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files are accepted.")
-
-    temp_dir = tempfile.mkdtemp()
-    temp_path = os.path.join(temp_dir, file.filename)
     try:
-        with open(temp_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-
-        df = pd.read_csv(temp_path)
-        if 'smiles' not in df.columns or 'solvent' not in df.columns:
-            raise HTTPException(status_code=400, detail="CSV must have 'smiles' and 'solvent' columns")
+        return pd.read_csv(file.file, usecols=['smiles', 'solvent'], dtype=str, chunksize=CHUNKSIZE)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="CSV must have 'smiles' and 'solvent' columns")
 
-        smiles_solvent_list = list(df[['smiles', 'solvent']].itertuples(index=False, name=None))
+def _chunk_tuples(chunk: pd.DataFrame) -> List[Tuple[str, str]]:
+    chunk = chunk.dropna()
+    return list(zip(chunk['smiles'].tolist(), chunk['solvent'].tolist()))
 
-        predictions = predict_lambda_max(smiles_solvent_list)
-        if not predictions:
-            raise HTTPException(status_code=500, detail="Prediction failed")
+def read_upload(file: UploadFile) -> List[Tuple[str, str]]:
+    """(smiles, solvent) rows of an uploaded CSV (HTTP 400 on bad input).
 
-        results = [
-            {"smiles": k[0], "solvent": k[1], "lambda_max": v}
-            for k, v in predictions.items()
-        ]
-        return JSONResponse(content={"predictions": results})
+    Blocking; endpoints run it in the default executor.
+    """
+    try:
+        rows: List[Tuple[str, str]] = []
+        for chunk in _read_input_chunks(file):
+            rows.extend(_chunk_tuples(chunk))
+        return rows
+    finally:
+        file.file.close()
 
+def _spool_upload(file: UploadFile):
+    """
+    Copy an upload to a private file that outlives the request body and open a
+    chunked reader on it; returns (path, reader). Blocking, so run in an executor.
+    """
+    spool = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+    try:
+        with spool:
+            shutil.copyfileobj(file.file, spool)
+        try:
+            reader = pd.read_csv(spool.name, usecols=['smiles', 'solvent'], dtype=str, chunksize=CHUNKSIZE)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="CSV must have 'smiles' and 'solvent' columns")
+    except BaseException:
+        os.unlink(spool.name)
+        raise
     finally:
         file.file.close()
-        shutil.rmtree(temp_dir)
\ No newline at end of file
+    return spool.name, reader
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.shutdown()
+
+@app.get("/")
+async def root():
+    return {"message": "Lambda Max Prediction API is running! Use POST /predict_lambda_max with CSV file, or POST /jobs/predict_lambda_max to queue it and poll GET /jobs/{job_id}."}
+
+@app.post("/predict_lambda_max")
+async def predict_lambda_max_api(file: UploadFile = File(...)):
+    smiles_solvent_list = await asyncio.get_running_loop().run_in_executor(None, read_upload, file)
+    job = job_queue.submit({"rows": smiles_solvent_list}, run_prediction, smiles_solvent_list)
+    await job_queue.wait(job)
+    if job.status != "done":
+        raise HTTPException(status_code=500, detail=job.error or "Prediction failed")
+    return JSONResponse(content=job.result)
+
+@app.post("/predict_lambda_max/stream")
+async def predict_lambda_max_stream(file: UploadFile = File(...)):
+    """
+    Predict a large CSV chunk by chunk, streaming newline-delimited JSON.
+
+    The upload is parsed PEAKPROPHET_LMAX_CHUNKSIZE rows at a time and each chunk
+    is predicted as soon as it is read, so memory stays bounded and results
+    arrive before the whole file is processed. Chunks run in the job pool but
+    are not kept as jobs, so finished chunks are freed once streamed. Each line
+    is one prediction ({"smiles", "solvent", "lambda_max"}) or {"error", "rows"}
+    for a failed chunk.
+    """
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files are accepted.")
+    loop = asyncio.get_running_loop()
+    spool_path, reader = await loop.run_in_executor(None, _spool_upload, file)
+
+    async def lines():
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, reader, None)
+                if chunk is None:
+                    break
+                rows = _chunk_tuples(chunk)
+                if not rows:
+                    continue
+                try:
+                    result = await job_queue.run(run_prediction, rows)
+                except Exception as e:
+                    logger.error(f"Chunk of {len(rows)} rows failed: {e}")
+                    yield json.dumps({"error": str(e) or "Prediction failed", "rows": len(rows)}) + "\n"
+                    continue
+                for record in result["predictions"]:
+                    yield json.dumps(record) + "\n"
+        finally:
+            reader.close()
+            os.unlink(spool_path)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/jobs/predict_lambda_max", status_code=202)
+async def submit_prediction_job(file: UploadFile = File(...)):
+    """
+    Queue a prediction and return its job id immediately.
+
+    Identical inputs share one job. Poll GET /jobs/{job_id} or stream
+    GET /jobs/{job_id}/stream for the result.
+    """
+    smiles_solvent_list = await asyncio.get_running_loop().run_in_executor(None, read_upload, file)
+    job = job_queue.submit({"rows": smiles_solvent_list}, run_prediction, smiles_solvent_list)
+    return job.to_dict(include_result=False)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0):
+    """Job status (and result once done); `wait` long-polls for up to that many seconds."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    if wait > 0:
+        await job_queue.wait(job, timeout=min(wait, 60.0))
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """Server-sent events with the job state on every change until it finishes."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    return StreamingResponse(job_queue.sse(job), media_type="text/event-stream")
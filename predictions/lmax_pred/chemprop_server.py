@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Resident Chemprop Inference Server
+
+Long-lived worker that runs inside the uvvismlenv conda environment, loads the
+uvvisml checkpoint ensemble (uvvisml/model_*/model.pt) once, and answers batched
+(smiles, solvent) lambda max requests over a local Unix socket. This replaces
+paying for conda activation, Python start-up, the torch import and checkpoint
+loading on every `conda run chemprop_predict` call.
+
+Protocol: one JSON object per line in each direction.
+    {"op": "ping"}                                  -> {"ok": true, "models": 5, "checkpoints": 5}
+    {"op": "predict", "pairs": [[smiles, solvent]]} -> {"ok": true, "predictions": [mean or null, ...], "std": [std or null, ...],
+                                                        "n_models": [members predicting, ...], "checkpoints": 5}
+    {"op": "shutdown"}                              -> {"ok": true}
+Errors are reported as {"ok": false, "error": "..."}. Checkpoints that fail to
+load or predict are left out of the ensemble, so n_models below checkpoints
+marks a partial-ensemble estimate.
+
+Usage (normally started automatically by lmax_pred.ChempropClient):
+    conda run -n uvvismlenv python chemprop_server.py --socket /tmp/peakprophet_chemprop.sock
+
+With --input and --output the ensemble instead predicts a smiles,solvent CSV
+once and writes peakwavs_max, std and n_models columns, without a socket:
+    conda run -n uvvismlenv python chemprop_server.py --input input.csv --output results.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uvvisml")
+
+
+def ensemble_checkpoints(checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR) -> List[str]:
+    """Paths of the uvvisml ensemble members (model_*/model.pt under checkpoint_dir)."""
+    return sorted(glob.glob(os.path.join(checkpoint_dir, "model_*", "model.pt")))
+
+
+def default_socket_path() -> str:
+    """$PEAKPROPHET_CHEMPROP_SOCKET, or a per-user socket in the temp directory."""
+    path = os.environ.get("PEAKPROPHET_CHEMPROP_SOCKET")
+    if path:
+        return path
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), "peakprophet_chemprop_{}.sock".format(os.getuid()))
+
+
+class ChempropEnsemble:
+    """
+    The uvvisml checkpoints, loaded once and kept in memory.
+
+    Each request is split into shards of shard_size pairs, and every
+    (member, shard) pair is evaluated on a pool of `workers` threads (default:
+    one per member), so members run in parallel and memory stays bounded.
+    """
+    def __init__(self, checkpoint_dir: str = DEFAULT_CHECKPOINT_DIR, batch_size: int = 256, shard_size: int = 5000, workers: Optional[int] = None):
+        import torch
+        from chemprop.utils import load_args, load_checkpoint, load_scalers
+
+        paths = ensemble_checkpoints(checkpoint_dir)
+        if not paths:
+            raise FileNotFoundError("No checkpoints found in {}".format(checkpoint_dir))
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.batch_size = batch_size
+        self.shard_size = max(1, shard_size)
+        self.n_checkpoints = len(paths)
+        self.members = []
+        for path in paths:
+            try:
+                scalers = load_scalers(path)
+                self.members.append({
+                    "path": path,
+                    "model": load_checkpoint(path, device=self.device),
+                    "scaler": scalers[0],
+                    "features_scaler": scalers[1],
+                    "args": load_args(path),
+                })
+            except Exception as e:
+                # The remaining members still give a (wider) estimate.
+                logger.error("Could not load {}: {}".format(path, e))
+        if not self.members:
+            raise RuntimeError("No checkpoint in {} could be loaded".format(checkpoint_dir))
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers or len(self.members), thread_name_prefix="member")
+        logger.info("Loaded {} of {} checkpoints from {}".format(len(self.members), self.n_checkpoints, checkpoint_dir))
+
+    def predict(self, pairs: List[List[str]]) -> Tuple[List[Optional[float]], List[Optional[float]], List[int]]:
+        """
+        Ensemble mean, standard deviation and member count of lambda max per
+        (smiles, solvent); None (and a count of 0) where a SMILES is invalid
+        or no member gave a prediction.
+        """
+        from rdkit import Chem
+        from chemprop.data import MoleculeDataLoader, get_data_from_smiles
+        from chemprop.train import predict
+
+        valid = [i for i, pair in enumerate(pairs) if all(s and Chem.MolFromSmiles(s) is not None for s in pair)]
+        means: List[Optional[float]] = [None] * len(pairs)
+        stds: List[Optional[float]] = [None] * len(pairs)
+        counts: List[int] = [0] * len(pairs)
+        if not valid:
+            return means, stds, counts
+
+        def run(member, lo, hi):
+            data = get_data_from_smiles(
+                smiles=[list(pairs[i]) for i in valid[lo:hi]],
+                skip_invalid_smiles=False,
+                features_generator=member["args"].features_generator,
+            )
+            if member["features_scaler"] is not None:
+                data.normalize_features(member["features_scaler"])
+            loader = MoleculeDataLoader(dataset=data, batch_size=self.batch_size, num_workers=0)
+            preds = predict(model=member["model"], data_loader=loader, scaler=member["scaler"], disable_progress_bar=True)
+            return [float(row[0]) if row[0] is not None else np.nan for row in preds]
+
+        # NaN where a member failed on a shard; the rest still give an estimate.
+        values = np.full((len(self.members), len(valid)), np.nan)
+        bounds = list(range(0, len(valid), self.shard_size)) + [len(valid)]
+        with self._lock:
+            futures = {
+                self._executor.submit(run, member, lo, hi): (m, lo, hi)
+                for m, member in enumerate(self.members)
+                for lo, hi in zip(bounds[:-1], bounds[1:])
+            }
+            for future, (m, lo, hi) in futures.items():
+                try:
+                    values[m, lo:hi] = future.result()
+                except Exception as e:
+                    logger.error("Checkpoint {} failed on rows {}-{}: {}".format(self.members[m]["path"], lo, hi, e))
+        for k, i in enumerate(valid):
+            column = values[:, k][np.isfinite(values[:, k])]
+            if column.size:
+                means[i] = float(column.mean())
+                stds[i] = float(column.std())
+                counts[i] = int(column.size)
+        return means, stds, counts
+
+    def predict_csv(self, input_file: str, output_file: str):
+        """Predict a smiles,solvent CSV into smiles, solvent, peakwavs_max, std and n_models columns."""
+        with open(input_file, newline="") as f:
+            pairs = [[row["smiles"], row["solvent"]] for row in csv.DictReader(f)]
+        means, stds, counts = self.predict(pairs)
+        with open(output_file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["smiles", "solvent", "peakwavs_max", "std", "n_models"])
+            for (smiles, solvent), mean, std, count in zip(pairs, means, stds, counts):
+                writer.writerow([smiles, solvent, "" if mean is None else mean, "" if std is None else std, count])
+        logger.info("Wrote {} predictions to {}".format(len(pairs), output_file))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            self.server.touch()
+            request = {}
+            try:
+                request = json.loads(line.decode("utf-8"))
+                response = self.server.dispatch(request)
+            except Exception as e:
+                logger.error("Request failed: {}".format(e))
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            if request.get("op") == "shutdown" and response.get("ok"):
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class ChempropServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, ensemble: ChempropEnsemble):
+        self.ensemble = ensemble
+        self.last_request = time.time()
+        super().__init__(socket_path, _Handler)
+
+    def touch(self):
+        self.last_request = time.time()
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "models": len(self.ensemble.members), "checkpoints": self.ensemble.n_checkpoints}
+        if op == "predict":
+            means, stds, counts = self.ensemble.predict(request.get("pairs", []))
+            return {"ok": True, "predictions": means, "std": stds, "n_models": counts, "checkpoints": self.ensemble.n_checkpoints}
+        if op == "shutdown":
+            return {"ok": True}
+        return {"ok": False, "error": "Unknown op: {}".format(op)}
+
+
+def _watch_idle(server: ChempropServer, idle_timeout: float):
+    while True:
+        time.sleep(min(idle_timeout, 30.0))
+        if time.time() - server.last_request > idle_timeout:
+            logger.info("Idle for {:.0f}s, shutting down".format(idle_timeout))
+            server.shutdown()
+            return
+
+
+def _is_listening(socket_path: str) -> bool:
+    import socket
+    if not os.path.exists(socket_path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident chemprop lambda max server")
+    parser.add_argument("--socket", default=default_socket_path(), help="Unix socket path to listen on")
+    parser.add_argument("--checkpoint_dir", default=DEFAULT_CHECKPOINT_DIR, help="Directory with model_*/model.pt")
+    parser.add_argument("--batch_size", type=int, default=256)
+    parser.add_argument("--shard_size", type=int, default=5000, help="Pairs per (member, shard) task")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel (member, shard) tasks (default: one per member)")
+    parser.add_argument("--idle_timeout", type=float, default=1800.0, help="Exit after this many idle seconds (0 = never)")
+    parser.add_argument("--input", help="Predict this smiles,solvent CSV once instead of serving")
+    parser.add_argument("--output", help="Results CSV written with --input")
+    args = parser.parse_args()
+
+    if args.input:
+        if not args.output:
+            parser.error("--input requires --output")
+        ensemble = ChempropEnsemble(args.checkpoint_dir, batch_size=args.batch_size, shard_size=args.shard_size, workers=args.workers)
+        ensemble.predict_csv(args.input, args.output)
+        return
+
+    if _is_listening(args.socket):
+        logger.info("A server is already listening on {}".format(args.socket))
+        return
+
+    ensemble = ChempropEnsemble(args.checkpoint_dir, batch_size=args.batch_size, shard_size=args.shard_size, workers=args.workers)
+
+    if _is_listening(args.socket):
+        logger.info("A server is already listening on {}".format(args.socket))
+        return
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    server = ChempropServer(args.socket, ensemble)
+    os.chmod(args.socket, 0o600)
+    if args.idle_timeout > 0:
+        threading.Thread(target=_watch_idle, args=(server, args.idle_timeout), daemon=True).start()
+
+    logger.info("Listening on {}".format(args.socket))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Lambda Max Prediction Cache
+
+Persistent SQLite cache of uvvisml predictions keyed by canonical product SMILES
+and canonical solvent SMILES, so repeat screens of the same product set skip
+chemprop entirely. Entries hold the ensemble mean and, when it was computed,
+the ensemble standard deviation.
+"""
+
+import json
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    from predictions.sqlite_cache import SQLiteCache, default_cache_path
+except Exception:  # pragma: no cover - fallback for direct execution
+    from sqlite_cache import SQLiteCache, default_cache_path
+
+
+class LambdaMaxCache:
+    """{"mean": float, "std": float or None} keyed by (canonical SMILES, canonical solvent).
+
+    Bump `version` when the uvvisml checkpoints change to invalidate old entries.
+    """
+    def __init__(self, path: Optional[str] = None, version: str = "uvvisml-1", ttl: Optional[float] = None):
+        self.store = SQLiteCache(path or default_cache_path("lmax_pred.sqlite"), table="lambda_max", version=version, ttl=ttl)
+
+    @staticmethod
+    def _key(pair: Tuple[str, str]) -> str:
+        return json.dumps(list(pair))
+
+    def get_many(self, pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+        """Cached entries for the given canonical (smiles, solvent) pairs."""
+        keys = {self._key(p): tuple(p) for p in pairs}
+        found = self.store.get_many(keys.keys())
+        return {keys[k]: v for k, v in found.items()}
+
+    def set_many(self, entries: Dict[Tuple[str, str], dict]):
+        self.store.set_many({self._key(p): v for p, v in entries.items()})
+
+    def __repr__(self):
+        return f"LambdaMaxCache({self.store})"
+
+
+_default_cache: Optional[LambdaMaxCache] = None
+
+
+def get_default_lmax_cache() -> LambdaMaxCache:
+    """Process-wide cache in the default cache directory, created on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LambdaMaxCache()
+    return _default_cache
@@ -16,21 +16,52 @@ Usage:
 
 import os
 import sys
+import json
+import socket
+import time
+import numpy as np
 import pandas as pd
 import subprocess
 import tempfile
-from typing import List, Tuple, Dict
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Tuple, Dict, Optional
 import logging
 
+try:
+    from predictions.mol_cache import canonical_smiles
+    from predictions.lmax_pred.chemprop_server import default_socket_path, ensemble_checkpoints
+    from predictions.lmax_pred.lmax_cache import LambdaMaxCache, get_default_lmax_cache
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import canonical_smiles
+    from lmax_pred.chemprop_server import default_socket_path, ensemble_checkpoints
+    from lmax_pred.lmax_cache import LambdaMaxCache, get_default_lmax_cache
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_input_csv(smiles_solvent_tuples: List[Tuple[str, str]], output_file: str = "input.csv"):
-    """Create CSV file from (SMILES, solvent) pairs for chemprop input."""
-    df = pd.DataFrame(smiles_solvent_tuples, columns=['smiles', 'solvent'])
-    df.to_csv(output_file, index=False)
-    logger.info(f"Created input CSV: {output_file} ({df.shape[0]} rows)")
+RESULT_COLUMNS = ['smiles', 'solvent', 'peakwavs_max']
+DEFAULT_CHUNKSIZE = 100000
+
+def create_input_csv(smiles_solvent_tuples: Iterable[Tuple[str, str]], output_file: str = "input.csv", chunksize: int = DEFAULT_CHUNKSIZE):
+    """Create CSV file from (SMILES, solvent) pairs for chemprop input.
+
+    Pairs may come from any iterable and are written `chunksize` rows at a time,
+    so large screens never need a full DataFrame in memory.
+    """
+    iterator = iter(smiles_solvent_tuples)
+    n_rows = 0
+    header = True
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk and not header:
+            break
+        pd.DataFrame(chunk, columns=['smiles', 'solvent']).to_csv(output_file, index=False, header=header, mode='w' if header else 'a')
+        n_rows += len(chunk)
+        header = False
+        if len(chunk) < chunksize:
+            break
+    logger.info(f"Created input CSV: {output_file} ({n_rows} rows)")
     return output_file
 
 def run_chemprop_prediction(input_file: str = "input.csv", output_file: str = "results.csv"):
@@ -116,17 +147,30 @@ def run_chemprop_prediction_in_conda_env(input_file: str = "input.csv", output_f
         logger.error(f"Error: {e}")
         return False
 
-def extract_predictions(results_file: str) -> Dict[Tuple[str, str], float]:
+def iter_prediction_chunks(results_file: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[Dict[Tuple[str, str], float]]:
+    """
+    Read a chemprop results CSV in chunks of `chunksize` rows.
+
+    Only the smiles, solvent and peakwavs_max columns are parsed; non-numeric
+    predictions (e.g. "Invalid SMILES") become NaN. Yields one
+    {(smiles, solvent): lambda_max} dictionary per chunk.
+    """
+    reader = pd.read_csv(
+        results_file,
+        usecols=RESULT_COLUMNS,
+        dtype={'smiles': str, 'solvent': str},
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        values = pd.to_numeric(chunk['peakwavs_max'], errors='coerce').to_numpy(dtype=float)
+        yield dict(zip(zip(chunk['smiles'].tolist(), chunk['solvent'].tolist()), values.tolist()))
+
+def extract_predictions(results_file: str, chunksize: int = DEFAULT_CHUNKSIZE) -> Dict[Tuple[str, str], float]:
     """Extract lambda max predictions from chemprop results CSV."""
     try:
-        df = pd.read_csv(results_file)
         predictions = {}
-        
-        for _, row in df.iterrows():
-            smiles = row['smiles']
-            solvent = row['solvent']
-            lambda_max = row['peakwavs_max']
-            predictions[(smiles, solvent)] = lambda_max
+        for chunk in iter_prediction_chunks(results_file, chunksize=chunksize):
+            predictions.update(chunk)
         
         logger.info(f"Extracted {len(predictions)} predictions")
         return predictions
@@ -151,60 +195,383 @@ def predict_lambda_max(smiles_solvent_tuples: List[Tuple[str, str]]) -> Dict[Tup
     """
     logger.info(f"Starting lambda max prediction for {len(smiles_solvent_tuples)} compounds")
     
-    # Create input CSV file
-    input_file = create_input_csv(smiles_solvent_tuples)
-    
-    # Run chemprop prediction
-    output_file = "results.csv"
-    if not run_chemprop_prediction(input_file, output_file):
-        logger.error("Prediction failed")
-        return {}
-    
-    # Extract predictions
-    predictions = extract_predictions(output_file)
-    
-    # Clean up temporary files
-    try:
-        if os.path.exists(input_file):
-            os.remove(input_file)
-        if os.path.exists(output_file):
-            os.remove(output_file)
-        logger.info("Cleaned up temporary files")
-    except Exception as e:
-        logger.warning(f"Could not clean up temporary files: {e}")
-    
-    return predictions
+    # Private workspace so concurrent predictions never share files
+    with tempfile.TemporaryDirectory(prefix="lmax_pred_") as workspace:
+        input_file = create_input_csv(smiles_solvent_tuples, os.path.join(workspace, "input.csv"))
+        output_file = os.path.join(workspace, "results.csv")
+
+        # Run chemprop prediction
+        if not run_chemprop_prediction(input_file, output_file):
+            logger.error("Prediction failed")
+            return {}
+        
+        # Extract predictions (the workspace is removed on exit)
+        return extract_predictions(output_file)
+
+def _cached_lambda_max(
+    smiles_solvent_tuples: List[Tuple[str, str]],
+    predict_misses: Callable[[List[Tuple[str, str]]], Dict[Tuple[str, str], dict]],
+    need_std: bool,
+    cache: Optional[LambdaMaxCache],
+) -> Dict[Tuple[str, str], dict]:
+    """
+    Cache entries for the input tuples, predicting only what is missing.
+
+    Tuples are canonicalized and de-duplicated; one representative input tuple
+    per missing (canonical SMILES, canonical solvent) goes to `predict_misses`,
+    which returns {"mean", "std"} entries keyed by the tuples it was given.
+    Entries flagged "partial" (from an incomplete ensemble) are returned but
+    not cached. The result is keyed by the original input tuples.
+    """
+    cache = cache or get_default_lmax_cache()
+    keys = [(canonical_smiles(s) or s, canonical_smiles(v) or v) for s, v in smiles_solvent_tuples]
+    known = cache.get_many(set(keys))
+    if need_std:
+        known = {k: e for k, e in known.items() if e.get("std") is not None}
+
+    missing: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for pair, key in zip(smiles_solvent_tuples, keys):
+        if key not in known and key not in missing:
+            missing[key] = tuple(pair)
+
+    if missing:
+        logger.info(f"{len(set(keys)) - len(missing)} lambda max values cached, predicting {len(missing)}")
+        fresh = predict_misses(list(missing.values()))
+        # Failed rows (NaN) and partial ensembles are returned this time but never cached.
+        new_entries = {key: fresh[pair] for key, pair in missing.items() if pair in fresh}
+        cache.set_many({k: e for k, e in new_entries.items() if np.isfinite(e["mean"]) and not e.get("partial")})
+        known.update(new_entries)
+    else:
+        logger.info(f"All {len(keys)} lambda max values served from cache")
 
-def predict_lambda_max_in_conda_env(smiles_solvent_tuples: List[Tuple[str, str]], conda_env: str = "uvvismlenv") -> Dict[Tuple[str, str], float]:
+    return {tuple(pair): known[key] for pair, key in zip(smiles_solvent_tuples, keys) if key in known}
+
+def predict_lambda_max_in_conda_env(smiles_solvent_tuples: List[Tuple[str, str]], conda_env: str = "uvvismlenv", use_cache: bool = True, cache: Optional[LambdaMaxCache] = None) -> Dict[Tuple[str, str], float]:
     """
     Predict lambda max values for molecules using chemprop models.
     
     Takes a list of (SMILES, solvent) pairs and returns predicted lambda max values.
     Runs in the specified conda environment to avoid dependency conflicts.
+    Predictions are cached by canonical (SMILES, solvent); only uncached pairs
+    are sent to chemprop unless use_cache is False.
     """
+    if not use_cache:
+        return _predict_lambda_max_in_conda_env(smiles_solvent_tuples, conda_env)
+
+    def predict_misses(pairs):
+        return {k: {"mean": float(v), "std": None} for k, v in _predict_lambda_max_in_conda_env(pairs, conda_env).items()}
+
+    entries = _cached_lambda_max(smiles_solvent_tuples, predict_misses, need_std=False, cache=cache)
+    return {k: e["mean"] for k, e in entries.items()}
+
+def _predict_lambda_max_in_conda_env(smiles_solvent_tuples: List[Tuple[str, str]], conda_env: str) -> Dict[Tuple[str, str], float]:
     logger.info(f"Predicting lambda max for {len(smiles_solvent_tuples)} molecules")
 
-    # Create input CSV file
-    input_file = create_input_csv(smiles_solvent_tuples)
-    output_file = "results.csv"
+    # Private workspace so concurrent predictions never share files
+    with tempfile.TemporaryDirectory(prefix="lmax_pred_") as workspace:
+        input_file = create_input_csv(smiles_solvent_tuples, os.path.join(workspace, "input.csv"))
+        output_file = os.path.join(workspace, "results.csv")
+
+        # Run chemprop prediction
+        if not run_chemprop_prediction_in_conda_env(input_file, output_file, conda_env=conda_env):
+            logger.error("Chemprop prediction failed")
+            return {}
 
-    # Run chemprop prediction
-    if not run_chemprop_prediction_in_conda_env(input_file, output_file, conda_env=conda_env):
-        logger.error("Chemprop prediction failed")
+        # Extract results (the workspace is removed on exit)
+        return extract_predictions(output_file)
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chemprop_server.py")
+
+def predict_lambda_max_ensemble_in_conda_env(smiles_solvent_tuples: List[Tuple[str, str]], conda_env: str = "uvvismlenv") -> Dict[Tuple[str, str], Tuple[float, float, int]]:
+    """
+    Ensemble prediction in a single `conda run` of chemprop_server.py --input.
+
+    The checkpoints are loaded once and every member predicts every pair in
+    the same process, so the standard deviation costs no extra launches.
+
+    Returns
+    -------
+    Dict[Tuple[str, str], Tuple[float, float, int]]
+        (smiles, solvent) -> (ensemble mean, ensemble std, members predicting)
+    """
+    if not smiles_solvent_tuples:
         return {}
+    logger.info(f"Predicting lambda max for {len(smiles_solvent_tuples)} molecules with the ensemble in {conda_env}")
+    with tempfile.TemporaryDirectory(prefix="lmax_pred_") as workspace:
+        input_file = create_input_csv(smiles_solvent_tuples, os.path.join(workspace, "input.csv"))
+        output_file = os.path.join(workspace, "results.csv")
+        cmd = [
+            "conda", "run", "-n", conda_env,
+            "python", SERVER_SCRIPT, "--input", input_file, "--output", output_file,
+        ]
+        try:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Ensemble prediction failed: {e.stderr}")
+            return {}
+        results = pd.read_csv(output_file, dtype={'smiles': str, 'solvent': str})
 
-    # Extract results
-    predictions = extract_predictions(output_file)
+    means = pd.to_numeric(results['peakwavs_max'], errors='coerce').to_numpy(dtype=float)
+    stds = pd.to_numeric(results['std'], errors='coerce').to_numpy(dtype=float)
+    counts = results['n_models'].fillna(0).astype(int).to_numpy()
+    return {
+        (smiles, solvent): (float(mean), float(std), int(count))
+        for smiles, solvent, mean, std, count in zip(results['smiles'], results['solvent'], means, stds, counts)
+        if count > 0
+    }
 
-    # Clean up files
-    for file_path in [input_file, output_file]:
+class ChempropClient:
+    """
+    Client of the resident chemprop server (chemprop_server.py).
+
+    The server runs in the given conda environment with the uvvisml ensemble
+    loaded, so each request only pays for inference. It is started on demand
+    and exits on its own after a period without requests.
+    """
+    def __init__(self, socket_path: Optional[str] = None, conda_env: str = "uvvismlenv", timeout: float = 600.0, startup_timeout: float = 300.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.conda_env = conda_env
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+
+    def _request(self, payload: dict, timeout: Optional[float] = None) -> dict:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout or self.timeout)
+        try:
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+        finally:
+            sock.close()
+        if not line:
+            raise ConnectionError("Chemprop server closed the connection")
+        response = json.loads(line.decode("utf-8"))
+        if not response.get("ok"):
+            raise RuntimeError(f"Chemprop server error: {response.get('error')}")
+        return response
+
+    def is_running(self) -> bool:
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except Exception:
+            self._request({"op": "ping"}, timeout=5.0)
+            return True
+        except (OSError, ValueError, RuntimeError):
+            return False
+
+    def start(self):
+        """Launch the server in the conda environment (if not running) and wait until it answers."""
+        if self.is_running():
+            return
+        cmd = [
+            "conda", "run", "--no-capture-output", "-n", self.conda_env,
+            "python", SERVER_SCRIPT, "--socket", self.socket_path,
+        ]
+        logger.info(f"Starting resident chemprop server in {self.conda_env}...")
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.is_running():
+                logger.info("Chemprop server is ready")
+                return
+            if process.poll() is not None and not os.path.exists(self.socket_path):
+                raise RuntimeError(f"Chemprop server exited with code {process.returncode}")
+            time.sleep(0.5)
+        raise TimeoutError("Chemprop server did not start in time")
+
+    def predict_ensemble(self, smiles_solvent_tuples: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[float, float, Optional[int]]]:
+        """
+        (ensemble mean, ensemble std, members predicting) per (smiles, solvent);
+        tuples the models cannot parse are left out. The member count is None
+        if the server does not report it.
+        """
+        if not smiles_solvent_tuples:
+            return {}
+        response = self._request({"op": "predict", "pairs": [list(t) for t in smiles_solvent_tuples]})
+        counts = response.get("n_models") or [None] * len(smiles_solvent_tuples)
+        return {
+            tuple(t): (mean, std, count)
+            for t, mean, std, count in zip(smiles_solvent_tuples, response["predictions"], response["std"], counts)
+            if mean is not None
+        }
+
+    def checkpoints(self) -> Optional[int]:
+        """Number of checkpoints in the server's ensemble (None if not reported)."""
+        return self._request({"op": "ping"}, timeout=5.0).get("checkpoints")
+
+    def predict(self, smiles_solvent_tuples: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        """Lambda max per (smiles, solvent); tuples the models cannot parse are left out."""
+        return {k: mean for k, (mean, _, _) in self.predict_ensemble(smiles_solvent_tuples).items()}
+
+    def shutdown(self):
+        """Ask a running server to exit."""
+        try:
+            self._request({"op": "shutdown"}, timeout=5.0)
+        except (OSError, ValueError, RuntimeError):
             pass
 
-    return predictions
+def predict_lambda_max_resident(smiles_solvent_tuples: List[Tuple[str, str]], conda_env: str = "uvvismlenv", autostart: bool = True) -> Dict[Tuple[str, str], float]:
+    """
+    Predict lambda max values through the resident chemprop server.
+
+    Starts the server first if `autostart` is set and none is running; raises
+    if the server cannot be reached.
+    """
+    client = ChempropClient(conda_env=conda_env)
+    if autostart:
+        client.start()
+    logger.info(f"Predicting lambda max for {len(smiles_solvent_tuples)} molecules on the resident server")
+    return client.predict(smiles_solvent_tuples)
+
+def predict_lambda_max_with_uncertainty(smiles_solvent_tuples: List[Tuple[str, str]], conda_env: str = "uvvismlenv", use_server: Optional[bool] = None, use_cache: bool = True, cache: Optional[LambdaMaxCache] = None, return_counts: bool = False) -> Dict[Tuple[str, str], Tuple]:
+    """
+    Ensemble mean and standard deviation of lambda max per (smiles, solvent).
+
+    Uses the resident chemprop server (started on demand) and falls back to
+    one `conda run` of the same ensemble code (chemprop_server.py --input) if
+    the server is unavailable or disabled (use_server=False or
+    PEAKPROPHET_CHEMPROP_SERVER=0). Results are cached by canonical
+    (SMILES, solvent) unless use_cache is False.
+
+    If some checkpoints fail, the remaining members still give an estimate;
+    this is logged, such results are not cached, and with return_counts the
+    values are (mean, std, n_models) so callers can tell (n_models is None for
+    entries cached before member counts were recorded).
+    """
+    if use_server is None:
+        use_server = os.environ.get("PEAKPROPHET_CHEMPROP_SERVER", "1") != "0"
+
+    def predict_misses(pairs):
+        results, expected = None, None
+        if use_server:
+            try:
+                client = ChempropClient(conda_env=conda_env)
+                client.start()
+                expected = client.checkpoints()
+                results = client.predict_ensemble(pairs)
+            except Exception as e:
+                logger.warning(f"Resident chemprop server unavailable ({e}); using conda run")
+        if results is None:
+            results = predict_lambda_max_ensemble_in_conda_env(pairs, conda_env=conda_env)
+            expected = len(ensemble_checkpoints())
+        entries = {}
+        for k, (mean, std, count) in results.items():
+            entries[k] = {"mean": mean, "std": std, "n_models": count}
+            if count is not None and expected and count < expected:
+                entries[k]["partial"] = True
+        partial = sum(1 for e in entries.values() if e.get("partial"))
+        if partial:
+            logger.warning(f"{partial} of {len(entries)} lambda max predictions come from a partial ensemble (fewer than {expected} models)")
+        return entries
+
+    if not use_cache:
+        entries = predict_misses(list(dict.fromkeys(map(tuple, smiles_solvent_tuples))))
+    else:
+        entries = _cached_lambda_max(smiles_solvent_tuples, predict_misses, need_std=True, cache=cache)
+    if return_counts:
+        return {k: (e["mean"], e["std"], e.get("n_models")) for k, e in entries.items()}
+    return {k: (e["mean"], e["std"]) for k, e in entries.items()}
+
+class LambdaMaxMatrix:
+    """Lambda max predictions for every (product, solvent) combination.
+
+    mean and std are [P, S] arrays indexed by position in `smiles` and
+    `solvents`; NaN where no prediction is available. n_models, if given,
+    holds the number of ensemble members behind each value (0 where none or
+    unknown), so partial-ensemble estimates can be told apart.
+    """
+    def __init__(self, smiles: List[str], solvents: List[str], mean: np.ndarray, std: np.ndarray, n_models: Optional[np.ndarray] = None):
+        self.smiles = smiles
+        self.solvents = solvents
+        self.mean = mean
+        self.std = std
+        self.n_models = n_models
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.mean.shape
+
+    def fraction_weights(self, fractions) -> np.ndarray:
+        """Mixture fractions (a sequence aligned with solvents, or a {solvent: fraction} dict) as a normalized [S] array."""
+        if isinstance(fractions, dict):
+            unknown = set(fractions) - set(self.solvents)
+            if unknown:
+                raise ValueError(f"Fractions given for unknown solvents: {sorted(unknown)}")
+            weights = np.array([float(fractions.get(s, 0.0)) for s in self.solvents])
+        else:
+            weights = np.asarray(fractions, dtype=float)
+            if weights.shape != (len(self.solvents),):
+                raise ValueError(f"Expected {len(self.solvents)} fractions, got {weights.size}")
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Fractions must be non-negative and sum to a positive value")
+        return weights / weights.sum()
+
+    def mixture(self, fractions) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fraction-weighted lambda max per product for a solvent mixture.
+
+        Solvents without a prediction for a product are left out and the
+        remaining fractions renormalized. The std is combined the same way
+        (i.e. treating the per-solvent errors as fully correlated, which is
+        the conservative choice for one model evaluated on one molecule).
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            [P] mean and std (NaN for products with no prediction in any solvent)
+        """
+        weights = self.fraction_weights(fractions)
+        available = np.isfinite(self.mean) & (weights[None, :] > 0)
+        w = np.where(available, weights[None, :], 0.0)
+        total = w.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (np.where(available, self.mean, 0.0) * w).sum(axis=1) / total
+            std = (np.where(available, np.nan_to_num(self.std), 0.0) * w).sum(axis=1) / total
+        missing = total <= 0
+        mean[missing] = np.nan
+        std[missing] = np.nan
+        return mean, std
+
+    def to_dict(self) -> Dict[Tuple[str, str], Tuple[float, float]]:
+        """{(smiles, solvent): (mean, std)} for every available prediction."""
+        results = {}
+        for i, smiles in enumerate(self.smiles):
+            for j, solvent in enumerate(self.solvents):
+                if np.isfinite(self.mean[i, j]):
+                    results[(smiles, solvent)] = (float(self.mean[i, j]), float(self.std[i, j]))
+        return results
+
+    def __repr__(self):
+        return f"LambdaMaxMatrix(products={len(self.smiles)}, solvents={self.solvents})"
+
+def predict_lambda_max_matrix(smiles_list: List[str], solvents: List[str], conda_env: str = "uvvismlenv", use_server: Optional[bool] = None, use_cache: bool = True, cache: Optional[LambdaMaxCache] = None) -> LambdaMaxMatrix:
+    """
+    Lambda max of every product in every solvent from a single inference pass.
+
+    The products × solvents cross product is de-duplicated and predicted in
+    one batch with predict_lambda_max_with_uncertainty, instead of one chemprop
+    launch per solvent.
+    """
+    solvents = list(dict.fromkeys(solvents))
+    smiles_list = list(smiles_list)
+    unique_smiles = list(dict.fromkeys(smiles_list))
+    pairs = [(smiles, solvent) for smiles in unique_smiles for solvent in solvents]
+    mean = np.full((len(smiles_list), len(solvents)), np.nan)
+    std = np.full((len(smiles_list), len(solvents)), np.nan)
+    n_models = np.zeros((len(smiles_list), len(solvents)), dtype=int)
+    if not pairs:
+        return LambdaMaxMatrix(smiles_list, solvents, mean, std, n_models)
+
+    logger.info(f"Predicting lambda max for {len(unique_smiles)} products in {len(solvents)} solvents")
+    predictions = predict_lambda_max_with_uncertainty(pairs, conda_env=conda_env, use_server=use_server, use_cache=use_cache, cache=cache, return_counts=True)
+    for i, smiles in enumerate(smiles_list):
+        for j, solvent in enumerate(solvents):
+            value = predictions.get((smiles, solvent))
+            if value is None or value[0] is None:
+                continue
+            mean[i, j] = value[0]
+            std[i, j] = value[1] if value[1] is not None else np.nan
+            n_models[i, j] = value[2] or 0
+    return LambdaMaxMatrix(smiles_list, solvents, mean, std, n_models)
 
 def main():
     """Example usage of the lambda max predictor."""
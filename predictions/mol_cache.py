@@ -0,0 +1,139 @@
+"""
+Shared molecule cache.
+
+Parsing SMILES with RDKit and computing exact masses is repeated by several
+prediction modules (ASKCOS reactants and solvent, MS adduct prediction, cache
+keys of the RT and λmax predictors). This module memoizes that work once per
+process in an LRU cache keyed on canonical SMILES, with an optional persistent
+SQLite tier so repeated injections of the same reaction skip RDKit entirely.
+
+The persistent tier is enabled with configure_mol_cache(path) or by setting the
+PEAKPROPHET_MOL_CACHE environment variable to a file path.
+"""
+
+import os
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from rdkit import Chem
+from rdkit.Chem import Descriptors, rdMolDescriptors
+
+try:
+    from predictions.sqlite_cache import SQLiteCache
+except Exception:  # pragma: no cover - fallback for direct execution
+    from sqlite_cache import SQLiteCache
+
+DEFAULT_MAXSIZE = 65536
+
+_disk_aliases: Optional[SQLiteCache] = None
+_disk_info: Optional[SQLiteCache] = None
+_disk_lock = threading.Lock()
+
+
+class MolInfo:
+    """Cached properties of one molecule, identified by its canonical SMILES."""
+    def __init__(self, canonical_smiles: str, exact_mass: float, formula: str, mol: Optional[Chem.Mol] = None):
+        self.canonical_smiles = canonical_smiles
+        self.exact_mass = exact_mass
+        self.formula = formula
+        self._mol = mol
+
+    @property
+    def mol(self) -> Chem.Mol:
+        """Parsed RDKit molecule (re-parsed lazily for entries from the disk tier)."""
+        if self._mol is None:
+            self._mol = Chem.MolFromSmiles(self.canonical_smiles)
+        return self._mol
+
+    def __repr__(self):
+        return f"MolInfo(smiles='{self.canonical_smiles}', exact_mass={self.exact_mass:.6f}, formula='{self.formula}')"
+
+
+def configure_mol_cache(path: Optional[str] = None, maxsize: Optional[int] = None):
+    """Enable (or disable with path=None) the persistent tier and optionally resize the LRU.
+
+    Resizing clears the in-process cache.
+    """
+    global _disk_aliases, _disk_info, _canonicalize, _info_for_canonical
+    with _disk_lock:
+        if path is None:
+            _disk_aliases = None
+            _disk_info = None
+        else:
+            _disk_aliases = SQLiteCache(path, table="mol_alias")
+            _disk_info = SQLiteCache(path, table="mol_info")
+    if maxsize is not None:
+        _canonicalize = lru_cache(maxsize=maxsize)(_canonicalize.__wrapped__)
+        _info_for_canonical = lru_cache(maxsize=maxsize)(_info_for_canonical.__wrapped__)
+
+
+def clear_mol_cache():
+    """Drop the in-process LRU entries (the persistent tier is left untouched)."""
+    _canonicalize.cache_clear()
+    _info_for_canonical.cache_clear()
+
+
+@lru_cache(maxsize=DEFAULT_MAXSIZE)
+def _canonicalize(smiles: str) -> Optional[str]:
+    """Canonical SMILES for any input spelling, or None if it does not parse."""
+    if _disk_aliases is not None:
+        hit = _disk_aliases.get(smiles)
+        if hit is not None:
+            return hit
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    canonical = Chem.MolToSmiles(mol)
+    if _disk_aliases is not None:
+        _disk_aliases.set(smiles, canonical)
+    return canonical
+
+
+@lru_cache(maxsize=DEFAULT_MAXSIZE)
+def _info_for_canonical(canonical: str) -> Optional[MolInfo]:
+    """Properties of a canonical SMILES, from the disk tier or RDKit."""
+    if _disk_info is not None:
+        hit = _disk_info.get(canonical)
+        if hit is not None:
+            return MolInfo(canonical, float(hit["exact_mass"]), hit["formula"])
+    mol = Chem.MolFromSmiles(canonical)
+    if mol is None:
+        return None
+    info = MolInfo(canonical, float(Descriptors.ExactMolWt(mol)), rdMolDescriptors.CalcMolFormula(mol), mol)
+    if _disk_info is not None:
+        _disk_info.set(canonical, {"exact_mass": info.exact_mass, "formula": info.formula})
+    return info
+
+
+def get_mol_info(smiles: str) -> Optional[MolInfo]:
+    """Cached MolInfo for a SMILES string, or None if it cannot be parsed."""
+    if not smiles:
+        return None
+    canonical = _canonicalize(smiles)
+    if canonical is None:
+        return None
+    return _info_for_canonical(canonical)
+
+
+def canonical_smiles(smiles: str) -> Optional[str]:
+    """Canonical SMILES, or None if the input cannot be parsed."""
+    if not smiles:
+        return None
+    return _canonicalize(smiles)
+
+
+def exact_mass(smiles: str) -> Optional[float]:
+    """Exact monoisotopic mass, or None if the input cannot be parsed."""
+    info = get_mol_info(smiles)
+    return info.exact_mass if info is not None else None
+
+
+def molecular_formula(smiles: str) -> Optional[str]:
+    """Molecular formula (Hill notation), or None if the input cannot be parsed."""
+    info = get_mol_info(smiles)
+    return info.formula if info is not None else None
+
+
+if os.environ.get("PEAKPROPHET_MOL_CACHE"):
+    configure_mol_cache(os.environ["PEAKPROPHET_MOL_CACHE"])
@@ -0,0 +1,138 @@
+"""
+Isotope pattern generation.
+
+Computes M, M+1, M+2, ... isotope envelopes from a molecular formula by
+polynomial convolution of elemental isotope distributions. Each distribution is
+binned by nominal mass offset and carries the abundance-weighted exact mass
+shift of every bin, so the envelope gives both relative intensities and accurate
+peak positions. Element powers use repeated squaring with truncation, and
+results are cached per (element, count) and per (formula, multimer).
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import numpy as np
+
+# (exact mass, natural abundance) per isotope, lightest first (IUPAC values).
+ISOTOPES: Dict[str, List[Tuple[float, float]]] = {
+    "H": [(1.00782503207, 0.999885), (2.0141017778, 0.000115)],
+    "B": [(10.0129370, 0.199), (11.0093054, 0.801)],
+    "C": [(12.0, 0.9893), (13.0033548378, 0.0107)],
+    "N": [(14.0030740048, 0.99636), (15.0001088982, 0.00364)],
+    "O": [(15.99491461956, 0.99757), (16.99913170, 0.00038), (17.9991610, 0.00205)],
+    "F": [(18.99840322, 1.0)],
+    "Na": [(22.9897692809, 1.0)],
+    "Si": [(27.9769265325, 0.92223), (28.976494700, 0.04685), (29.97377017, 0.03092)],
+    "P": [(30.97376163, 1.0)],
+    "S": [(31.97207100, 0.9499), (32.97145876, 0.0075), (33.96786690, 0.0425), (35.96708076, 0.0001)],
+    "Cl": [(34.96885268, 0.7576), (36.96590259, 0.2424)],
+    "K": [(38.96370668, 0.932581), (39.96399848, 0.000117), (40.96182576, 0.067302)],
+    "Se": [(73.9224764, 0.0089), (75.9192136, 0.0937), (76.9199140, 0.0763), (77.9173091, 0.2377), (79.9165213, 0.4961), (81.9166994, 0.0873)],
+    "Br": [(78.9183371, 0.5069), (80.9162906, 0.4931)],
+    "I": [(126.904473, 1.0)],
+}
+
+# Bins kept while convolving; isotope peaks beyond this are negligible for
+# the molecules we predict.
+MAX_BINS = 12
+
+_FORMULA_TOKEN = re.compile(r"([A-Z][a-z]?)(\d*)")
+
+
+class _Distribution:
+    """Isotope distribution binned by nominal offset from the most abundant isotope(s).
+
+    `start` is the nominal offset of the first bin, `p` the bin abundances and
+    `w` the abundance-weighted exact mass shifts (shift = w / p).
+    """
+    __slots__ = ("start", "p", "w")
+
+    def __init__(self, start: int, p: np.ndarray, w: np.ndarray):
+        self.start = start
+        self.p = p
+        self.w = w
+
+    def __mul__(self, other: "_Distribution") -> "_Distribution":
+        p = np.convolve(self.p, other.p)
+        w = np.convolve(self.w, other.p) + np.convolve(self.p, other.w)
+        return _Distribution(self.start + other.start, p, w)._truncated()
+
+    def _truncated(self) -> "_Distribution":
+        if self.p.size <= MAX_BINS:
+            return self
+        # Keep the window of MAX_BINS bins holding the most abundance.
+        window = np.convolve(self.p, np.ones(MAX_BINS), mode="valid")
+        lo = int(np.argmax(window))
+        return _Distribution(self.start + lo, self.p[lo:lo + MAX_BINS], self.w[lo:lo + MAX_BINS])
+
+
+_UNIT = _Distribution(0, np.ones(1), np.zeros(1))
+
+
+@lru_cache(maxsize=None)
+def _element_distribution(element: str) -> _Distribution:
+    """Single-atom distribution relative to the element's most abundant isotope.
+
+    RDKit's ExactMolWt uses the most abundant isotope, so offsets are taken
+    relative to it. Elements without isotope data are treated as monoisotopic.
+    """
+    isotopes = ISOTOPES.get(element)
+    if not isotopes:
+        return _UNIT
+    masses = np.array([m for m, _ in isotopes])
+    abundances = np.array([a for _, a in isotopes])
+    ref = masses[int(np.argmax(abundances))]
+    nominal = np.rint(masses - ref).astype(int)
+    start = int(nominal.min())
+    p = np.zeros(int(nominal.max()) - start + 1)
+    w = np.zeros_like(p)
+    np.add.at(p, nominal - start, abundances)
+    np.add.at(w, nominal - start, abundances * (masses - ref))
+    return _Distribution(start, p, w)
+
+
+@lru_cache(maxsize=4096)
+def _element_power(element: str, count: int) -> _Distribution:
+    """Distribution of `count` atoms of an element by repeated squaring."""
+    result = _UNIT
+    base = _element_distribution(element)
+    while count:
+        if count & 1:
+            result = result * base
+        count >>= 1
+        if count:
+            base = base * base
+    return result
+
+
+def parse_formula(formula: str) -> Dict[str, int]:
+    """Element counts of a Hill-notation formula (charge signs are ignored)."""
+    counts: Dict[str, int] = {}
+    for element, number in _FORMULA_TOKEN.findall(formula):
+        counts[element] = counts.get(element, 0) + (int(number) if number else 1)
+    return counts
+
+
+@lru_cache(maxsize=16384)
+def isotope_envelope(formula: str, multimer: int = 1, min_relative: float = 1e-3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Isotope envelope of `multimer` copies of a formula.
+
+    Returns (mass_shift, relative_intensity): exact mass shifts relative to the
+    monoisotopic (most-abundant-isotope) mass, and intensities scaled so the
+    largest peak is 1. Peaks below `min_relative` are dropped.
+    The returned arrays are shared between callers and must not be modified.
+    """
+    dist = _UNIT
+    for element, count in parse_formula(formula).items():
+        dist = dist * _element_power(element, count * multimer)
+
+    p = dist.p
+    shift = np.divide(dist.w, p, out=np.zeros_like(p), where=p > 0)
+    rel = p / p.max()
+    keep = rel >= min_relative
+    shift, rel = shift[keep], rel[keep]
+    shift.setflags(write=False)
+    rel.setflags(write=False)
+    return shift, rel
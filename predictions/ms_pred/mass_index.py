@@ -0,0 +1,109 @@
+"""
+Reverse mass index.
+
+Maps observed m/z values back to the predicted (product, adduct) pairs that
+could explain them. Every adduct m/z of an AdductTable is stored in one sorted
+array, so a tolerance window is two binary searches and a whole spectrum (or a
+whole run) is annotated with one vectorized searchsorted call.
+"""
+
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+
+try:
+    from predictions.ms_pred.ms_pred import AdductTable, ADDUCT_NAMES, IonizationProfile, predict_ms_adduct_table
+except Exception:  # pragma: no cover - fallback for direct execution
+    from ms_pred.ms_pred import AdductTable, ADDUCT_NAMES, IonizationProfile, predict_ms_adduct_table
+
+
+class MassIndex:
+    """Sorted index over every (product, adduct) m/z of an AdductTable."""
+    def __init__(self, table: AdductTable):
+        order = np.argsort(table.mz, kind="stable")
+        self.smiles = table.smiles
+        self.mz = table.mz[order]
+        self.mol_index = table.mol_index[order]
+        self.adduct_id = table.adduct_id[order]
+        self.probability = table.probability[order]
+
+    @classmethod
+    def from_smiles(cls, smiles_list: List[str], profile: Optional[IonizationProfile] = None) -> "MassIndex":
+        """Build the index directly from product SMILES (optionally under an ionization profile)."""
+        return cls(predict_ms_adduct_table(smiles_list, profile=profile))
+
+    def __len__(self) -> int:
+        return int(self.mz.size)
+
+    def query_batch(self, mz_values, mz_tol: float = 0.01, ppm: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidates within tolerance of every query m/z.
+
+        Parameters
+        ----------
+        mz_values : array
+            Observed m/z values (e.g. all centroids of a spectrum).
+        mz_tol : float
+            Absolute m/z tolerance in Da if ppm is None.
+        ppm : Optional[float]
+            Parts-per-million tolerance (relative to the query); used instead of mz_tol.
+
+        Returns
+        -------
+        (offsets, rows) in CSR layout: the candidates of query q are the index
+        rows rows[offsets[q]:offsets[q + 1]], in increasing m/z.
+        """
+        q = np.asarray(mz_values, dtype=float).ravel()
+        tol = q * ppm / 1e6 if ppm is not None else np.full(q.shape, mz_tol)
+        lo = np.searchsorted(self.mz, q - tol, side="left")
+        hi = np.searchsorted(self.mz, q + tol, side="right")
+        counts = hi - lo
+        offsets = np.zeros(q.size + 1, dtype=int)
+        np.cumsum(counts, out=offsets[1:])
+        rows = np.repeat(lo - offsets[:-1], counts) + np.arange(offsets[-1])
+        return offsets, rows
+
+    def query(self, mz: float, mz_tol: float = 0.01, ppm: Optional[float] = None) -> np.ndarray:
+        """Index rows within tolerance of a single m/z."""
+        _, rows = self.query_batch([mz], mz_tol=mz_tol, ppm=ppm)
+        return rows
+
+    def annotate(self, mz_values, mz_tol: float = 0.01, ppm: Optional[float] = None) -> List[List[Dict]]:
+        """
+        Candidate explanations for each observed m/z.
+
+        Returns one list per query of dicts with 'smiles', 'mol_index', 'adduct',
+        'mz', 'ppm_error' and 'probability', sorted by decreasing probability.
+        """
+        q = np.asarray(mz_values, dtype=float).ravel()
+        offsets, rows = self.query_batch(q, mz_tol=mz_tol, ppm=ppm)
+        query_of_row = np.repeat(np.arange(q.size), np.diff(offsets))
+        ppm_error = (q[query_of_row] - self.mz[rows]) / self.mz[rows] * 1e6
+
+        annotations: List[List[Dict]] = []
+        for k in range(q.size):
+            hits = []
+            for pos in range(offsets[k], offsets[k + 1]):
+                row = rows[pos]
+                hits.append({
+                    "smiles": self.smiles[self.mol_index[row]],
+                    "mol_index": int(self.mol_index[row]),
+                    "adduct": ADDUCT_NAMES[self.adduct_id[row]],
+                    "mz": float(self.mz[row]),
+                    "ppm_error": float(ppm_error[pos]),
+                    "probability": float(self.probability[row]),
+                })
+            hits.sort(key=lambda h: h["probability"], reverse=True)
+            annotations.append(hits)
+        return annotations
+
+    def annotate_run(self, spectra_mz: List[np.ndarray], mz_tol: float = 0.01, ppm: Optional[float] = None) -> List[List[List[Dict]]]:
+        """Annotate many spectra with a single batched query; one result list per spectrum."""
+        sizes = [np.asarray(m).size for m in spectra_mz]
+        if not sizes:
+            return []
+        flat = self.annotate(np.concatenate([np.asarray(m, dtype=float).ravel() for m in spectra_mz]), mz_tol=mz_tol, ppm=ppm)
+        bounds = np.concatenate([[0], np.cumsum(sizes)])
+        return [flat[bounds[i]:bounds[i + 1]] for i in range(len(sizes))]
+
+    def __repr__(self):
+        return f"MassIndex(entries={len(self)})"
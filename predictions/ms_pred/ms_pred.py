@@ -3,12 +3,26 @@
 Mass Spectrometry Prediction using Adduct Analysis
 
 This module predicts mass spectrometry adducts for a list of SMILES strings.
-It returns a dictionary mapping SMILES to adduct masses and their relative probabilities.
+The adduct tables below are compiled once into NumPy arrays, and all adduct m/z
+values for a batch of molecules come from a single outer product. Results are
+returned as a columnar AdductTable (molecule index, adduct id, m/z, probability);
+predict_ms_adducts keeps the legacy {smiles: {adduct_mass: probability}} view.
+predict_ms_spectra expands every adduct into its isotope envelope to give
+centroid spectra that can be scored against observed MS data. An optional
+IonizationProfile (polarity, mobile-phase additives, max charge) prunes and
+re-weights the adduct table before enumeration.
 """
 
-from typing import List, Dict, Tuple
-from rdkit import Chem
-from rdkit.Chem import Descriptors
+import re
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+
+try:
+    from predictions.mol_cache import exact_mass, molecular_formula
+    from predictions.ms_pred.isotopes import isotope_envelope
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import exact_mass, molecular_formula
+    from ms_pred.isotopes import isotope_envelope
 
 positive_adducts = [{
     "mass": 1.007276,
@@ -213,50 +227,216 @@ negative_adducts = [{
 }]
 
 
-def predict_ms_adducts(smiles_list: List[str]) -> Dict[str, Dict[float, float]]:
+class IonizationProfile:
+    """Ionization conditions of a run, used to prune and re-weight the adduct table.
+
+    polarity: 'positive', 'negative' or 'both'.
+    additives: species available from the mobile phase or sample matrix, named
+        as in the adduct labels (e.g. 'ACN', 'CH3OH', 'FA', 'Hac', 'NH4', 'TFA',
+        'Cl', 'Br', 'DMSO', 'IsoProp'). Adducts that need any other species are
+        dropped; None keeps every adduct. Protons, water loss and the ubiquitous
+        Na/K adducts are always allowed.
+    max_charge / max_multimer: highest charge state and highest n in [nM...] kept.
+    weights: per-species probability multipliers (e.g. {'NH4': 1.5} with an
+        ammonium buffer); an adduct's probability is multiplied by the weight of
+        every species it contains.
+    """
+    ALWAYS_AVAILABLE = frozenset({"H", "H2O", "Na", "K"})
+
+    def __init__(self, polarity: str = "both", additives: Optional[List[str]] = None, max_charge: int = 3, max_multimer: int = 3, weights: Optional[Dict[str, float]] = None):
+        if polarity not in ("positive", "negative", "both"):
+            raise ValueError(f"Unknown polarity: {polarity}")
+        self.polarity = polarity
+        self.additives = None if additives is None else frozenset(additives)
+        self.max_charge = max_charge
+        self.max_multimer = max_multimer
+        self.weights = dict(weights or {})
+
+    def adduct_mask(self) -> np.ndarray:
+        """Boolean mask over the compiled adduct table of adducts possible under this profile."""
+        mask = (ADDUCT_CHARGE <= self.max_charge) & (ADDUCT_MULTIMER <= self.max_multimer)
+        if self.polarity == "positive":
+            mask &= ADDUCT_POLARITY > 0
+        elif self.polarity == "negative":
+            mask &= ADDUCT_POLARITY < 0
+        if self.additives is not None:
+            allowed = self.ALWAYS_AVAILABLE | self.additives
+            mask &= np.array([species <= allowed for species in ADDUCT_SPECIES], dtype=bool)
+        return mask
+
+    def adduct_probabilities(self) -> np.ndarray:
+        """Literature probabilities re-weighted by the species multipliers."""
+        factor = np.array([np.prod([self.weights.get(sp, 1.0) for sp in species]) for species in ADDUCT_SPECIES], dtype=float)
+        return ADDUCT_PROBABILITY * factor
+
+    def __repr__(self):
+        additives = sorted(self.additives) if self.additives is not None else None
+        return (f"IonizationProfile(polarity='{self.polarity}', additives={additives}, "
+                f"max_charge={self.max_charge}, max_multimer={self.max_multimer}, weights={self.weights})")
+
+
+class AdductTable:
+    """Columnar adduct predictions with one row per (molecule, adduct).
+
+    mol_index indexes into `smiles` (the input list); adduct_id indexes into the
+    compiled ADDUCT_* arrays. Rows are grouped by molecule, in input order.
+    Molecules that could not be parsed have no rows and a NaN exact mass.
+    """
+    def __init__(self, smiles: List[str], exact_mass: np.ndarray, mol_index: np.ndarray, adduct_id: np.ndarray, mz: np.ndarray, probability: np.ndarray):
+        self.smiles = smiles
+        self.exact_mass = exact_mass
+        self.mol_index = mol_index
+        self.adduct_id = adduct_id
+        self.mz = mz
+        self.probability = probability
+
+    def __len__(self) -> int:
+        return int(self.mz.size)
+
+    def adduct_names(self) -> np.ndarray:
+        """Adduct label for every row."""
+        return ADDUCT_NAMES[self.adduct_id]
+
+    def rows_for(self, index: int) -> slice:
+        """Row slice holding the adducts of molecule `index`."""
+        lo = int(np.searchsorted(self.mol_index, index, side="left"))
+        hi = int(np.searchsorted(self.mol_index, index, side="right"))
+        return slice(lo, hi)
+
+    def to_dict(self) -> Dict[str, Dict[float, float]]:
+        """Legacy {smiles: {adduct_mass: probability}} view.
+
+        Adducts of one molecule that land on the same m/z collapse into one key;
+        the highest probability is kept.
+        """
+        results: Dict[str, Dict[float, float]] = {}
+        for index, smiles in enumerate(self.smiles):
+            rows = self.rows_for(index)
+            if rows.start == rows.stop:
+                continue
+            adducts: Dict[float, float] = {}
+            for mass, prob in zip(self.mz[rows].tolist(), self.probability[rows].tolist()):
+                adducts[mass] = max(prob, adducts.get(mass, 0.0))
+            results[smiles] = adducts
+        return results
+
+    def __repr__(self):
+        n_mols = int(np.unique(self.mol_index).size)
+        return f"AdductTable(molecules={n_mols}, rows={len(self)})"
+
+
+def _exact_masses(smiles_list: List[str]) -> np.ndarray:
+    """Exact monoisotopic mass per SMILES (NaN where parsing fails), via the shared molecule cache."""
+    masses = np.full(len(smiles_list), np.nan, dtype=float)
+    for index, smiles in enumerate(smiles_list):
+        try:
+            mass = exact_mass(smiles)
+        except Exception as e:
+            print(f"Error processing SMILES {smiles}: {e}")
+            continue
+        if mass is not None:
+            masses[index] = mass
+    return masses
+
+
+def predict_ms_adduct_table(smiles_list: List[str], profile: Optional[IonizationProfile] = None) -> AdductTable:
+    """
+    Predict mass spectrometry adducts for a list of SMILES strings.
+
+    Args:
+        smiles_list: List of SMILES strings to predict adducts for
+        profile: Optional IonizationProfile; adducts impossible under it are
+            pruned before enumeration and probabilities are re-weighted
+
+    Returns:
+        AdductTable with one row per (valid molecule, adduct); m/z values are
+        computed for all molecules and adducts in one outer product.
+    """
+    if profile is None:
+        ids = np.arange(ADDUCT_NAMES.size)
+        probability = ADDUCT_PROBABILITY
+    else:
+        ids = np.flatnonzero(profile.adduct_mask())
+        probability = profile.adduct_probabilities()[ids]
+
+    masses = _exact_masses(smiles_list)
+    valid = np.flatnonzero(~np.isnan(masses))
+
+    mz = masses[valid, None] * ADDUCT_MULTIPLICITY[ids][None, :] + ADDUCT_MASS[ids][None, :]
+    return AdductTable(
+        smiles=list(smiles_list),
+        exact_mass=masses,
+        mol_index=np.repeat(valid, ids.size),
+        adduct_id=np.tile(ids, valid.size),
+        mz=mz.ravel(),
+        probability=np.tile(probability, valid.size),
+    )
+
+
+def predict_ms_adducts(smiles_list: List[str], profile: Optional[IonizationProfile] = None) -> Dict[str, Dict[float, float]]:
     """
     Predict mass spectrometry adducts for a list of SMILES strings.
     
     Args:
         smiles_list: List of SMILES strings to predict adducts for
+        profile: Optional IonizationProfile restricting and re-weighting adducts
         
     Returns:
         Dictionary mapping SMILES to adduct masses and their relative probabilities
         Format: {smiles: {adduct_mass: probability}}
+        Use predict_ms_adduct_table for the columnar form, which keeps adducts
+        with colliding masses apart.
     """
-    results = {}
-    
-    for smiles in smiles_list:
-        try:
-            # Calculate molecular weight
-            mol = Chem.MolFromSmiles(smiles)
-            if mol is None:
-                continue
-                
-            mol_weight = Descriptors.ExactMolWt(mol)
-            
-            # Calculate adduct masses and probabilities for ALL adducts
-            adduct_predictions = {}
-            
-            # Include ALL positive adducts
-            for adduct in positive_adducts:
-                adduct_mass = mol_weight * adduct["multiplicity"] + adduct["mass"]
-                probability = _get_adduct_probability(adduct["adduct"])
-                adduct_predictions[adduct_mass] = probability
-            
-            # Include ALL negative adducts
-            for adduct in negative_adducts:
-                adduct_mass = mol_weight * adduct["multiplicity"] + adduct["mass"]
-                probability = _get_adduct_probability(adduct["adduct"])
-                adduct_predictions[adduct_mass] = probability
-            
-            results[smiles] = adduct_predictions
-            
-        except Exception as e:
-            print(f"Error processing SMILES {smiles}: {e}")
+    return predict_ms_adduct_table(smiles_list, profile=profile).to_dict()
+
+
+def predict_ms_spectra(smiles_list: List[str], table: Optional[AdductTable] = None, profile: Optional[IonizationProfile] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Predict centroid mass spectra (adducts with isotope envelopes) for a list of SMILES.
+
+    Every adduct row contributes its M, M+1, M+2, ... peaks: positions are the
+    adduct m/z plus the envelope mass shifts divided by the charge, intensities
+    are the adduct probability times the relative isotope abundance. Envelopes
+    are computed for the n-mer of each molecule (n = multiplicity * charge) and
+    cached per formula; isotopes of the adduct ions themselves are ignored.
+
+    Args:
+        smiles_list: List of SMILES strings
+        table: Optional precomputed AdductTable for smiles_list
+        profile: Optional IonizationProfile, used when table is not given
+
+    Returns:
+        List aligned with smiles_list of (mz, intensity) arrays sorted by m/z;
+        both arrays are empty for SMILES that cannot be parsed.
+    """
+    if table is None:
+        table = predict_ms_adduct_table(smiles_list, profile=profile)
+
+    spectra: List[Tuple[np.ndarray, np.ndarray]] = []
+    for index, smiles in enumerate(smiles_list):
+        rows = table.rows_for(index)
+        formula = molecular_formula(smiles) if rows.start != rows.stop else None
+        if formula is None:
+            spectra.append((np.array([], dtype=float), np.array([], dtype=float)))
             continue
-    
-    return results
+
+        ids = table.adduct_id[rows]
+        mz = table.mz[rows]
+        prob = table.probability[rows]
+        mz_parts = []
+        int_parts = []
+        for n in np.unique(ADDUCT_MULTIMER[ids]):
+            sel = ADDUCT_MULTIMER[ids] == n
+            shift, rel = isotope_envelope(formula, int(n))
+            charge = ADDUCT_CHARGE[ids[sel]]
+            mz_parts.append((mz[sel, None] + shift[None, :] / charge[:, None]).ravel())
+            int_parts.append((prob[sel, None] * rel[None, :]).ravel())
+
+        all_mz = np.concatenate(mz_parts)
+        all_int = np.concatenate(int_parts)
+        order = np.argsort(all_mz, kind="stable")
+        spectra.append((all_mz[order], all_int[order]))
+    return spectra
 
 
 def _get_adduct_probability(adduct_name: str) -> float:
@@ -385,6 +565,55 @@ def _get_adduct_probability(adduct_name: str) -> float:
         return 0.05
 
 
+def _adduct_charge(adduct_name: str) -> int:
+    """Charge state from the trailing ']n+' / ']n-' of an adduct label."""
+    match = re.search(r"\](\d*)([+-])$", adduct_name)
+    if match is None:
+        raise ValueError(f"Cannot parse charge of adduct {adduct_name}")
+    return int(match.group(1) or 1)
+
+
+def _adduct_species(adduct_name: str) -> frozenset:
+    """Species added or lost in an adduct label, e.g. '[M+2ACN+2H]2+' -> {'ACN', 'H'}."""
+    core = adduct_name[adduct_name.index("M") + 1:adduct_name.rindex("]")]
+    return frozenset(re.findall(r"[+-]\d*([A-Za-z][A-Za-z0-9]*)", core))
+
+
+def _compile_adduct_table(adducts: List[Dict]) -> Tuple[np.ndarray, ...]:
+    """Compile adduct dicts into arrays of name, mass offset, multiplicity, charge, polarity and probability."""
+    names = np.array([a["adduct"] for a in adducts], dtype=object)
+    mass = np.array([a["mass"] for a in adducts], dtype=float)
+    multiplicity = np.array([a["multiplicity"] for a in adducts], dtype=float)
+    charge = np.array([_adduct_charge(a["adduct"]) for a in adducts], dtype=int)
+    polarity = np.array([1 if a["adduct"].endswith("+") else -1 for a in adducts], dtype=int)
+    probability = np.array([_get_adduct_probability(a["adduct"]) for a in adducts], dtype=float)
+    species = np.array([_adduct_species(a["adduct"]) for a in adducts], dtype=object)
+    return names, mass, multiplicity, charge, polarity, probability, species
+
+
+# Positive adducts first, then negative, matching the order of the source tables.
+(
+    ADDUCT_NAMES,
+    ADDUCT_MASS,
+    ADDUCT_MULTIPLICITY,
+    ADDUCT_CHARGE,
+    ADDUCT_POLARITY,
+    ADDUCT_PROBABILITY,
+    ADDUCT_SPECIES,
+) = _compile_adduct_table(positive_adducts + negative_adducts)
+
+# Number of molecules in each adduct ion (M, 2M, 3M).
+ADDUCT_MULTIMER = np.rint(ADDUCT_MULTIPLICITY * ADDUCT_CHARGE).astype(int)
+
+# Reference ionization profiles for common reversed-phase LC-MS conditions.
+IONIZATION_PROFILES = {
+    "positive_formic_acn": IonizationProfile(polarity="positive", additives=["ACN", "FA"], max_charge=2),
+    "negative_formic_acn": IonizationProfile(polarity="negative", additives=["ACN", "FA", "Cl"], max_charge=2),
+    "positive_ammonium_meoh": IonizationProfile(polarity="positive", additives=["CH3OH", "NH4"], max_charge=2, weights={"NH4": 1.5}),
+    "negative_acetate_meoh": IonizationProfile(polarity="negative", additives=["CH3OH", "Hac", "Cl"], max_charge=2, weights={"Hac": 1.5}),
+}
+
+
 def main():
     """Example usage of the MS adduct predictor."""
     # Example SMILES list
@@ -1,164 +1,99 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import asyncio
+import io
 import tempfile
-import shutil
 import os
 import logging
-from pyppeteer import launch
+from typing import List
 import pandas as pd
 
+try:
+    from predictions.rt_pred.browser_pool import BrowserPool
+    from predictions.rt_pred.coalescer import RequestCoalescer
+    from predictions.job_queue import JobQueue
+except Exception:  # pragma: no cover - fallback for direct execution
+    from browser_pool import BrowserPool
+    from coalescer import RequestCoalescer
+    from job_queue import JobQueue
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Retention Time Prediction API (Puppeteer)", version="2.0.0")
 
-async def predict_retention_time_puppeteer(csv_file_path: str):
-    """
-    Use Puppeteer to predict retention times from the rtpred.ca website.
-    
-    Parameters
-    ----------
-    csv_file_path : str
-        Path to the CSV file containing SMILES data
-        
-    Returns
-    -------
-    list
-        List of dictionaries containing prediction results
-    """
-    browser = None
+# Warm pages shared by all requests, the coalescer feeding them and the
+# background job queue; created on startup.
+browser_pool = None
+coalescer = None
+job_queue = None
+
+async def submit_smiles_batch(smiles_list: List[str]) -> List[dict]:
+    """Upload SMILES (one per line, no header) as a single rtpred.ca submission."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+        f.write("".join(f"{smiles}\n" for smiles in smiles_list))
+        temp_path = f.name
     try:
-        # Launch browser with appropriate options for headless operation
-        browser = await launch({
-            'headless': True,
-            'args': [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
-                '--no-first-run',
-                '--no-zygote',
-                '--disable-gpu'
-            ]
-        })
-        
-        page = await browser.newPage()
-        
-        # Set viewport
-        await page.setViewport({'width': 1280, 'height': 720})
-        
-        # Navigate to the website
-        logger.info("Navigating to rtpred.ca...")
-        await page.goto('https://rtpred.ca/predict/', {'waitUntil': 'networkidle0'})
-        
-        # Wait for the page to load
-        await page.waitForSelector('#selected_CM', {'timeout': 10000})
-        
-        # Select "CS22" from the dropdown
-        logger.info("Selecting CS22 method...")
-        await page.select('#selected_CM', 'CS22')
-        
-        # Wait for file input to be available
-        await page.waitForSelector('#csv_input_predict', {'timeout': 5000})
-        
-        # Upload the CSV file
-        logger.info(f"Uploading file: {csv_file_path}")
-        file_input = await page.querySelector('#csv_input_predict')
-        await file_input.uploadFile(csv_file_path)
-        
-        # Click the submit button
-        logger.info("Submitting prediction request...")
-        
-        # Try multiple methods to find the submit button
-        submit_button = None
-        
-        # Method 1: Try CSS selector
-        try:
-            submit_button = await page.querySelector("button[type='submit']")
-        except:
-            pass
-            
-        # Method 2: Try XPath using evaluateHandle
-        if not submit_button:
-            try:
-                submit_button = await page.evaluateHandle('''
-                    () => {
-                        const xpath = "//button[normalize-space()='Submit']";
-                        const result = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-                        return result.singleNodeValue;
-                    }
-                ''')
-            except:
-                pass
-                
-        # Method 3: Find by text content
-        if not submit_button:
-            try:
-                submit_button = await page.evaluateHandle('''
-                    () => {
-                        const buttons = document.querySelectorAll('button');
-                        for (const button of buttons) {
-                            if (button.textContent.trim() === 'Submit') {
-                                return button;
-                            }
-                        }
-                        return null;
-                    }
-                ''')
-            except:
-                pass
-        
-        # Click the button if found
-        if submit_button:
-            try:
-                await submit_button.click()
-                logger.info("Submit button clicked successfully")
-            except Exception as e:
-                logger.error(f"Error clicking submit button: {e}")
-                raise Exception("Submit button found but could not be clicked")
-        else:
-            raise Exception("Submit button not found")
-        
-        # Wait for results table to appear
-        logger.info("Waiting for results...")
-        await page.waitForSelector('#new_pred table tbody', {'timeout': 30000})
-        
-        # Extract results from the table
-        results = await page.evaluate('''
-            () => {
-                const rows = document.querySelectorAll('#new_pred table tbody tr');
-                const results = [];
-                rows.forEach(row => {
-                    const cols = row.querySelectorAll('td');
-                    if (cols.length >= 3) {
-                        results.push({
-                            index: cols[0].textContent.trim(),
-                            smiles: cols[1].textContent.trim(),
-                            retention_time: cols[2].textContent.trim()
-                        });
-                    }
-                });
-                return results;
-            }
-        ''')
-        
-        logger.info(f"Extracted {len(results)} predictions")
-        return results
-        
-    except Exception as e:
-        logger.error(f"Error during prediction: {e}")
-        raise e
+        return await browser_pool.predict(temp_path)
     finally:
-        if browser:
-            await browser.close()
+        os.unlink(temp_path)
+
+def read_smiles_csv(content: bytes) -> List[str]:
+    """SMILES from the first column of an uploaded CSV (a 'smiles' header row is skipped)."""
+    df = pd.read_csv(io.BytesIO(content), header=None, usecols=[0], dtype=str, skip_blank_lines=True)
+    smiles = [s.strip() for s in df[0].dropna()]
+    if smiles and smiles[0].lower() == "smiles":
+        smiles = smiles[1:]
+    return [s for s in smiles if s]
+
+@app.on_event("startup")
+async def start_browser_pool():
+    """Launch the shared browser and warm its pages before serving requests."""
+    global browser_pool, coalescer, job_queue
+    browser_pool = BrowserPool(size=int(os.environ.get("PEAKPROPHET_RT_POOL_SIZE", "2")))
+    await browser_pool.start()
+    coalescer = RequestCoalescer(submit_smiles_batch)
+    job_queue = JobQueue(max_workers=int(os.environ.get("PEAKPROPHET_JOB_WORKERS", "4")))
+
+@app.on_event("shutdown")
+async def stop_browser_pool():
+    if job_queue is not None:
+        await job_queue.shutdown()
+    if coalescer is not None:
+        await coalescer.drain()
+    if browser_pool is not None:
+        await browser_pool.close()
 
 @app.get("/")
 async def root():
     return {
         "message": "Retention Time Prediction API (Puppeteer) is running!",
-        "usage": "Use POST /predict_retention_time with CSV file containing SMILES data."
+        "usage": "Use POST /predict_retention_time with CSV file containing SMILES data, or POST /jobs/predict_retention_time to queue it and poll GET /jobs/{job_id}."
+    }
+
+async def read_upload(file: UploadFile) -> List[str]:
+    """Validate an uploaded CSV and return its SMILES (HTTP 400 on bad input)."""
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files are accepted.")
+    try:
+        content = await file.read()
+        smiles_list = await asyncio.get_running_loop().run_in_executor(None, read_smiles_csv, content)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read CSV: {str(e)}")
+    finally:
+        file.file.close()
+    if not smiles_list:
+        raise HTTPException(status_code=400, detail="CSV contains no SMILES.")
+    logger.info(f"Processing file: {file.filename} ({len(smiles_list)} SMILES)")
+    return smiles_list
+
+async def run_prediction(smiles_list: List[str]) -> dict:
+    results = await coalescer.predict(smiles_list)
+    return {
+        "message": "Prediction completed successfully",
+        "num_compounds": len(results),
+        "predictions": results
     }
 
 @app.post("/predict_retention_time")
@@ -166,42 +101,64 @@ async def predict_retention_time(file: UploadFile = File(...)):
     """
     Predict retention times from a CSV file using the rtpred.ca website.
     
-    The CSV file should contain SMILES data in a column.
+    The CSV file should contain SMILES data in its first column. Requests that
+    arrive together are coalesced into one combined submission.
     """
-    # Validate file extension
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Only CSV files are accepted.")
-
-    temp_dir = tempfile.mkdtemp()
-    temp_path = os.path.join(temp_dir, file.filename)
-
+    smiles_list = await read_upload(file)
     try:
-        # Save uploaded file
-        with open(temp_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-
-        logger.info(f"Processing file: {file.filename}")
-        
-        # Run prediction using Puppeteer
-        results = await predict_retention_time_puppeteer(temp_path)
-        
-        return JSONResponse(content={
-            "message": "Prediction completed successfully",
-            "num_compounds": len(results),
-            "predictions": results
-        })
-
+        return JSONResponse(content=await run_prediction(smiles_list))
     except Exception as e:
         logger.error(f"Prediction failed: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
-    finally:
-        file.file.close()
-        shutil.rmtree(temp_dir)
+
+@app.post("/jobs/predict_retention_time", status_code=202)
+async def submit_prediction_job(file: UploadFile = File(...)):
+    """
+    Queue a prediction and return its job id immediately.
+
+    Identical SMILES lists share one job. Poll GET /jobs/{job_id} or stream
+    GET /jobs/{job_id}/stream for the result.
+    """
+    smiles_list = await read_upload(file)
+    job = job_queue.submit({"smiles": smiles_list}, run_prediction, smiles_list)
+    return job.to_dict(include_result=False)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0):
+    """Job status (and result once done); `wait` long-polls for up to that many seconds."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    if wait > 0:
+        await job_queue.wait(job, timeout=min(wait, 60.0))
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """Server-sent events with the job state on every change until it finishes."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    return StreamingResponse(job_queue.sse(job), media_type="text/event-stream")
+
+@app.get("/metrics")
+async def metrics():
+    """Per-request latency and batching statistics of the coalescer."""
+    summary = coalescer.metrics.summary() if coalescer is not None else {}
+    return {
+        **summary,
+        "jobs": job_queue.stats() if job_queue is not None else {},
+        "window_ms": coalescer.window_ms if coalescer is not None else None,
+        "max_batch": coalescer.max_batch if coalescer is not None else None,
+    }
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "retention_time_prediction_api_puppeteer"}
+    return {
+        "status": "healthy" if browser_pool is not None and browser_pool.healthy else "degraded",
+        "service": "retention_time_prediction_api_puppeteer",
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,243 @@
+"""
+Retention Time Prediction Backends
+
+Retention times can come from the rtpred.ca web service or from a local
+descriptor-based regression model that runs in-process without network access.
+Both implement RTBackend; the backend used by ChemicalReaction is chosen with
+get_rt_backend(), from an explicit name or the PEAKPROPHET_RT_BACKEND
+environment variable ("rtpred" by default, or "local" together with
+PEAKPROPHET_RT_MODEL pointing to a model saved with DescriptorRTModel.save).
+"""
+
+import json
+import os
+import pickle
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from rdkit.Chem import Descriptors
+
+try:
+    from predictions.mol_cache import canonical_smiles, get_mol_info
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import canonical_smiles, get_mol_info
+
+try:
+    from sklearn.ensemble import HistGradientBoostingRegressor
+except Exception:  # pragma: no cover - scikit-learn is optional
+    HistGradientBoostingRegressor = None
+
+# RDKit descriptors that track reversed-phase retention (hydrophobicity, size,
+# polarity, hydrogen bonding, aromaticity and flexibility).
+DEFAULT_DESCRIPTORS = (
+    "MolLogP", "MolMR", "MolWt", "HeavyAtomCount", "TPSA", "LabuteASA",
+    "NumHDonors", "NumHAcceptors", "NumRotatableBonds", "RingCount",
+    "NumAromaticRings", "FractionCSP3", "NumHeteroatoms",
+)
+
+
+class RTBackend(ABC):
+    """Interface of retention time predictors."""
+    name = "base"
+
+    @abstractmethod
+    async def predict(self, smiles_list: List[str]) -> List[Optional[float]]:
+        """Retention time for each SMILES (None where no prediction is available)."""
+        raise NotImplementedError
+
+
+class RTPredWebBackend(RTBackend):
+    """Predictions scraped from rtpred.ca (see rt_pred.predict_retention_time_from_smiles)."""
+    name = "rtpred"
+
+    def __init__(self, method: str = "CS22", use_cache: bool = True):
+        self.method = method
+        self.use_cache = use_cache
+
+    async def predict(self, smiles_list: List[str]) -> List[Optional[float]]:
+        # Imported here so the local backend works without pyppeteer installed.
+        try:
+            from predictions.rt_pred.rt_pred import predict_retention_time_from_smiles
+        except ImportError:  # pragma: no cover - fallback for direct execution
+            from rt_pred.rt_pred import predict_retention_time_from_smiles
+        results = await predict_retention_time_from_smiles(smiles_list, method=self.method, use_cache=self.use_cache)
+        values: List[Optional[float]] = []
+        for result in results:
+            try:
+                rt = result.get("retention_time")
+                values.append(float(rt) if rt not in (None, "") else None)
+            except (TypeError, ValueError):
+                values.append(None)
+        return values
+
+    def __repr__(self):
+        return f"RTPredWebBackend(method='{self.method}')"
+
+
+@lru_cache(maxsize=65536)
+def _descriptor_row(canonical: str, names: tuple) -> Optional[np.ndarray]:
+    info = get_mol_info(canonical)
+    if info is None:
+        return None
+    mol = info.mol
+    row = np.array([float(getattr(Descriptors, name)(mol)) for name in names])
+    row.setflags(write=False)
+    return row
+
+
+def descriptor_matrix(smiles_list: Sequence[str], names: Sequence[str] = DEFAULT_DESCRIPTORS) -> np.ndarray:
+    """RDKit descriptors of each SMILES as an [N, D] array (rows of NaN for unparseable SMILES)."""
+    names = tuple(names)
+    X = np.full((len(smiles_list), len(names)), np.nan)
+    for i, smiles in enumerate(smiles_list):
+        canonical = canonical_smiles(smiles)
+        row = _descriptor_row(canonical, names) if canonical is not None else None
+        if row is not None:
+            X[i] = row
+    return X
+
+
+class DescriptorRTModel(RTBackend):
+    """
+    Local retention time model on RDKit descriptors.
+
+    Parameters
+    ----------
+    model : str
+        "ridge" (closed-form ridge regression in numpy) or "tree"
+        (gradient-boosted trees, requires scikit-learn)
+    alpha : float
+        Ridge penalty on the standardized descriptors
+    descriptors : Sequence[str]
+        Names of RDKit Descriptors functions used as features
+    method : Optional[str]
+        Chromatographic method the training data was measured with (informational)
+    """
+    name = "local"
+
+    def __init__(self, model: str = "ridge", alpha: float = 1.0, descriptors: Sequence[str] = DEFAULT_DESCRIPTORS, method: Optional[str] = None):
+        if model not in ("ridge", "tree"):
+            raise ValueError(f"Unknown model type: {model}")
+        if model == "tree" and HistGradientBoostingRegressor is None:
+            raise ImportError("The tree model requires scikit-learn")
+        self.model = model
+        self.alpha = alpha
+        self.descriptors = tuple(descriptors)
+        self.method = method
+        self.mean_: Optional[np.ndarray] = None
+        self.scale_: Optional[np.ndarray] = None
+        self.coef_: Optional[np.ndarray] = None
+        self.intercept_: float = 0.0
+        self.estimator_ = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.coef_ is not None or self.estimator_ is not None
+
+    def fit(self, smiles_list: Sequence[str], retention_times: Sequence[float]) -> "DescriptorRTModel":
+        """Fit on training compounds; rows with unparseable SMILES or missing RT are skipped."""
+        X = descriptor_matrix(smiles_list, self.descriptors)
+        y = np.asarray(retention_times, dtype=float)
+        keep = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        X, y = X[keep], y[keep]
+        if len(y) < 2:
+            raise ValueError("Need at least two valid training compounds")
+
+        if self.model == "tree":
+            self.estimator_ = HistGradientBoostingRegressor().fit(X, y)
+            return self
+
+        self.mean_ = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+        Z = (X - self.mean_) / self.scale_
+        self.intercept_ = float(y.mean())
+        A = Z.T @ Z + self.alpha * np.eye(Z.shape[1])
+        self.coef_ = np.linalg.solve(A, Z.T @ (y - self.intercept_))
+        return self
+
+    def fit_csv(self, csv_path: str, smiles_column: str = "smiles", rt_column: str = "rt") -> "DescriptorRTModel":
+        """Fit on a CSV with SMILES and measured retention time columns."""
+        import pandas as pd
+        df = pd.read_csv(csv_path, usecols=[smiles_column, rt_column], dtype={smiles_column: str})
+        return self.fit(df[smiles_column].tolist(), pd.to_numeric(df[rt_column], errors="coerce").to_numpy())
+
+    def predict_array(self, smiles_list: Sequence[str]) -> np.ndarray:
+        """Predicted retention times as a float array (NaN for unparseable SMILES)."""
+        if not self.fitted:
+            raise RuntimeError("Model is not fitted")
+        X = descriptor_matrix(smiles_list, self.descriptors)
+        valid = np.isfinite(X).all(axis=1)
+        out = np.full(len(smiles_list), np.nan)
+        if valid.any():
+            if self.estimator_ is not None:
+                out[valid] = self.estimator_.predict(X[valid])
+            else:
+                out[valid] = ((X[valid] - self.mean_) / self.scale_) @ self.coef_ + self.intercept_
+        return out
+
+    async def predict(self, smiles_list: List[str]) -> List[Optional[float]]:
+        return [None if np.isnan(v) else float(v) for v in self.predict_array(smiles_list)]
+
+    def save(self, path: str):
+        """Save the fitted model (JSON for ridge, pickle for tree models)."""
+        if not self.fitted:
+            raise RuntimeError("Model is not fitted")
+        state: Dict = {"model": self.model, "alpha": self.alpha, "descriptors": list(self.descriptors), "method": self.method}
+        if self.model == "tree":
+            state["estimator"] = self.estimator_
+            with open(path, "wb") as f:
+                pickle.dump(state, f)
+            return
+        state.update(mean=self.mean_.tolist(), scale=self.scale_.tolist(), coef=self.coef_.tolist(), intercept=self.intercept_)
+        with open(path, "w") as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path: str) -> "DescriptorRTModel":
+        """Load a model written by save()."""
+        with open(path, "rb") as f:
+            head = f.read(1)
+        if head == b"{":
+            with open(path) as f:
+                state = json.load(f)
+        else:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        model = cls(model=state["model"], alpha=state["alpha"], descriptors=state["descriptors"], method=state.get("method"))
+        if model.model == "tree":
+            model.estimator_ = state["estimator"]
+        else:
+            model.mean_ = np.asarray(state["mean"])
+            model.scale_ = np.asarray(state["scale"])
+            model.coef_ = np.asarray(state["coef"])
+            model.intercept_ = float(state["intercept"])
+        return model
+
+    def __repr__(self):
+        return f"DescriptorRTModel(model='{self.model}', descriptors={len(self.descriptors)}, fitted={self.fitted})"
+
+
+def get_rt_backend(name: Optional[str] = None, model_path: Optional[str] = None, method: str = "CS22") -> RTBackend:
+    """
+    Retention time backend by name ("rtpred" or "local").
+
+    Defaults to $PEAKPROPHET_RT_BACKEND (or "rtpred"); the local backend loads
+    its model from model_path or $PEAKPROPHET_RT_MODEL.
+    """
+    name = (name or os.environ.get("PEAKPROPHET_RT_BACKEND", "rtpred")).lower()
+    if name == "rtpred":
+        return RTPredWebBackend(method=method)
+    if name == "local":
+        model_path = model_path or os.environ.get("PEAKPROPHET_RT_MODEL")
+        if not model_path:
+            raise ValueError("The local RT backend needs a model path (PEAKPROPHET_RT_MODEL)")
+        return _load_local_model(os.path.abspath(model_path))
+    raise ValueError(f"Unknown RT backend: {name}")
+
+
+@lru_cache(maxsize=8)
+def _load_local_model(path: str) -> DescriptorRTModel:
+    return DescriptorRTModel.load(path)
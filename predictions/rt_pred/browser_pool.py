@@ -0,0 +1,341 @@
+"""
+Headless Browser Pool for rtpred.ca
+
+Keeps one long-lived Chromium with a fixed number of pages already sitting on
+the rtpred.ca predict form. A prediction checks out a page, submits, and hands
+the page back; the page is re-navigated to the form in the background so the
+next checkout is ready immediately. Pages are health-checked on checkout, and
+the browser is relaunched if it crashes or disconnects.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+from pyppeteer import launch
+
+logger = logging.getLogger(__name__)
+
+PREDICT_URL = 'https://rtpred.ca/predict/'
+
+# These options work on both Mac and Linux servers
+LAUNCH_OPTIONS = {
+    'headless': True,
+    'args': [
+        '--no-sandbox',
+        '--disable-setuid-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-accelerated-2d-canvas',
+        '--no-first-run',
+        '--no-zygote',
+        '--disable-gpu',
+        '--disable-web-security',
+        '--disable-features=VizDisplayCompositor'
+    ]
+}
+
+_FIND_SUBMIT_BY_XPATH = '''
+    () => {
+        const xpath = "//button[normalize-space()='Submit']";
+        const result = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+        return result.singleNodeValue;
+    }
+'''
+
+_FIND_SUBMIT_BY_TEXT = '''
+    () => {
+        const buttons = document.querySelectorAll('button');
+        for (const button of buttons) {
+            if (button.textContent.trim() === 'Submit') {
+                return button;
+            }
+        }
+        return null;
+    }
+'''
+
+_EXTRACT_RESULTS = '''
+    () => {
+        const rows = document.querySelectorAll('#new_pred table tbody tr');
+        const results = [];
+        rows.forEach(row => {
+            const cols = row.querySelectorAll('td');
+            if (cols.length >= 3) {
+                results.push({
+                    index: cols[0].textContent.trim(),
+                    smiles: cols[1].textContent.trim(),
+                    retention_time: cols[2].textContent.trim()
+                });
+            }
+        });
+        return results;
+    }
+'''
+
+
+async def load_predict_page(page, url: str = PREDICT_URL):
+    """Navigate a page to the predict form and wait until it is usable."""
+    await page.goto(url, {'waitUntil': 'networkidle0'})
+    await page.waitForSelector('#selected_CM', {'timeout': 10000})
+
+
+async def submit_predictions(page, csv_file_path: str, method: str = "CS22") -> List[dict]:
+    """
+    Submit a SMILES CSV on a page showing the predict form and scrape the results.
+
+    Parameters
+    ----------
+    page : pyppeteer.page.Page
+        Page already loaded with load_predict_page
+    csv_file_path : str
+        Path to the CSV file containing SMILES data
+    method : str
+        Chromatographic method selected on rtpred.ca
+
+    Returns
+    -------
+    list
+        List of dictionaries containing prediction results
+    """
+    # Select the chromatographic method from the dropdown
+    logger.info(f"Selecting {method} method...")
+    await page.select('#selected_CM', method)
+
+    # Wait for file input to be available
+    await page.waitForSelector('#csv_input_predict', {'timeout': 5000})
+
+    # Upload the CSV file
+    logger.info(f"Uploading file: {csv_file_path}")
+    file_input = await page.querySelector('#csv_input_predict')
+    await file_input.uploadFile(csv_file_path)
+
+    # Click the submit button
+    logger.info("Submitting prediction request...")
+
+    # Try a CSS selector, then XPath, then the button text
+    submit_button = None
+    try:
+        submit_button = await page.querySelector("button[type='submit']")
+    except Exception:
+        pass
+    for finder in (_FIND_SUBMIT_BY_XPATH, _FIND_SUBMIT_BY_TEXT):
+        if submit_button:
+            break
+        try:
+            submit_button = await page.evaluateHandle(finder)
+        except Exception:
+            pass
+
+    if not submit_button:
+        raise Exception("Submit button not found")
+    try:
+        await submit_button.click()
+        logger.info("Submit button clicked successfully")
+    except Exception as e:
+        logger.error(f"Error clicking submit button: {e}")
+        raise Exception("Submit button found but could not be clicked")
+
+    # Wait for results table to appear
+    logger.info("Waiting for results...")
+    await page.waitForSelector('#new_pred table tbody', {'timeout': 30000})
+
+    results = await page.evaluate(_EXTRACT_RESULTS)
+    logger.info(f"Extracted {len(results)} predictions")
+    return results
+
+
+class BrowserPool:
+    """
+    Pool of pre-warmed rtpred.ca pages in one shared headless browser.
+
+    Parameters
+    ----------
+    size : int
+        Number of pages (i.e. concurrent submissions)
+    launch_options : Optional[dict]
+        pyppeteer launch options (defaults to LAUNCH_OPTIONS)
+    url : str
+        Page every pooled tab is kept on
+    health_timeout : float
+        Seconds a page has to answer the checkout health check
+    """
+    def __init__(self, size: int = 2, launch_options: Optional[dict] = None, url: str = PREDICT_URL, health_timeout: float = 5.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.launch_options = launch_options or LAUNCH_OPTIONS
+        self.url = url
+        self.health_timeout = health_timeout
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._browser = None
+        self._generation = 0
+        self._connected = False
+        self._pages: Optional[asyncio.Queue] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._background = set()
+        self._closed = False
+
+    async def start(self):
+        """
+        Launch the browser and warm every page (idempotent).
+
+        The page queue is only published once the browser is up, so a failed
+        launch raises here and the next call tries again.
+        """
+        if self._pages is not None:
+            return self
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._pages is not None:
+                return self
+            self.loop = asyncio.get_running_loop()
+            self._launch_lock = asyncio.Lock()
+            await self._relaunch(self._generation)
+            pages = asyncio.Queue()
+            entries = await asyncio.gather(*(self._fresh_entry() for _ in range(self.size)), return_exceptions=True)
+            for entry in entries:
+                if isinstance(entry, Exception):
+                    # Not fatal: the slot is re-created on its first checkout.
+                    logger.warning(f"Could not warm pooled page: {entry}")
+                    entry = (-1, None)
+                pages.put_nowait(entry)
+            self._pages = pages
+        logger.info(f"Browser pool ready with {self.size} pages")
+        return self
+
+    async def close(self):
+        """Cancel background work and close the browser."""
+        self._closed = True
+        for task in list(self._background):
+            task.cancel()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+        self._browser = None
+        self._connected = False
+
+    def abandon(self):
+        """Kill the browser process without awaiting (for pools whose event loop is gone)."""
+        self._closed = True
+        process = getattr(self._browser, "process", None)
+        if process is not None and process.poll() is None:
+            process.terminate()
+        self._browser = None
+        self._connected = False
+
+    @property
+    def healthy(self) -> bool:
+        """True while the browser is running and connected."""
+        return self._browser is not None and self._connected
+
+    def _on_disconnected(self, *_):
+        logger.warning("Browser disconnected")
+        self._connected = False
+
+    async def _relaunch(self, seen_generation: int):
+        """Start a new browser unless another caller already replaced generation `seen_generation`."""
+        async with self._launch_lock:
+            if self._generation != seen_generation and self.healthy:
+                return
+            old = self._browser
+            if old is not None:
+                try:
+                    await old.close()
+                except Exception:
+                    pass
+            logger.info("Launching headless browser...")
+            self._browser = await launch(self.launch_options)
+            self._connected = True
+            self._browser.on('disconnected', self._on_disconnected)
+            self._generation += 1
+
+    async def _fresh_entry(self) -> Tuple[int, object]:
+        """A new page on the current browser, loaded with the predict form."""
+        generation = self._generation
+        if not self.healthy:
+            await self._relaunch(generation)
+            generation = self._generation
+        page = await self._browser.newPage()
+        await page.setViewport({'width': 1280, 'height': 720})
+        await load_predict_page(page, self.url)
+        return generation, page
+
+    async def _is_usable(self, generation: int, page) -> bool:
+        if page is None or generation != self._generation or not self.healthy or page.isClosed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate('() => !!document.querySelector("#selected_CM")'), self.health_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, page):
+        if page is not None and self.healthy:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+    async def _recycle(self, generation: int, page, reload: bool):
+        """Return a page to the pool, re-navigating (or replacing) it first."""
+        entry = (generation, page)
+        try:
+            if reload:
+                await load_predict_page(page, self.url)
+            else:
+                await self._discard(page)
+                entry = await self._fresh_entry()
+        except Exception as e:
+            logger.warning(f"Pooled page could not be restored: {e}")
+            await self._discard(page)
+            # Re-created on its next checkout.
+            entry = (-1, None)
+        finally:
+            self._pages.put_nowait(entry)
+
+    def _in_background(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    @asynccontextmanager
+    async def page(self):
+        """Check out a warm page; it goes back to the pool when the block exits."""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        await self.start()
+        generation, page = await self._pages.get()
+        try:
+            if not await self._is_usable(generation, page):
+                logger.info("Replacing unhealthy pooled page")
+                await self._discard(page)
+                generation, page = await self._fresh_entry()
+        except BaseException:
+            self._pages.put_nowait((-1, None))
+            raise
+
+        ok = False
+        try:
+            yield page
+            ok = True
+        finally:
+            if self._closed:
+                pass
+            elif ok:
+                self._in_background(self._recycle(generation, page, reload=True))
+            else:
+                if not self.healthy:
+                    logger.warning("Browser crashed during a prediction; relaunching")
+                self._in_background(self._recycle(generation, page, reload=False))
+
+    async def predict(self, csv_file_path: str, method: str = "CS22") -> List[dict]:
+        """Submit a SMILES CSV on a pooled page and return the scraped results."""
+        async with self.page() as page:
+            return await submit_predictions(page, csv_file_path, method)
+
+    def __repr__(self):
+        return f"BrowserPool(size={self.size}, healthy={self.healthy})"
@@ -0,0 +1,188 @@
+"""
+Request Coalescing for the Retention Time Service
+
+Concurrent prediction requests are buffered for a short window (or until a
+maximum batch size is reached), submitted to rtpred.ca as one combined upload,
+and the result rows are matched back to their SMILES (by index and SMILES, not
+position) and fanned out to each waiting request. Per-request
+latency (time spent waiting for the batch and total time) is recorded so the
+effect of batching can be monitored.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from predictions.rt_pred.rt_results import align_result_rows
+except Exception:  # pragma: no cover - fallback for direct execution
+    from rt_results import align_result_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_MS = float(os.environ.get("PEAKPROPHET_RT_COALESCE_WINDOW_MS", "50"))
+DEFAULT_MAX_BATCH = int(os.environ.get("PEAKPROPHET_RT_MAX_BATCH", "200"))
+
+
+class LatencyMetrics:
+    """Rolling per-request latency samples and batch statistics."""
+    def __init__(self, max_samples: int = 1000):
+        self.wait_ms = deque(maxlen=max_samples)
+        self.total_ms = deque(maxlen=max_samples)
+        self.batch_sizes = deque(maxlen=max_samples)
+        self.requests = 0
+        self.batches = 0
+        self.failures = 0
+
+    def record_request(self, wait_ms: float, total_ms: float):
+        self.requests += 1
+        self.wait_ms.append(wait_ms)
+        self.total_ms.append(total_ms)
+
+    def record_batch(self, n_requests: int, n_smiles: int, ok: bool):
+        self.batches += 1
+        self.batch_sizes.append((n_requests, n_smiles))
+        if not ok:
+            self.failures += 1
+
+    @staticmethod
+    def _summary(samples) -> Dict[str, float]:
+        if not samples:
+            return {"count": 0}
+        values = np.fromiter(samples, dtype=float)
+        return {
+            "count": int(values.size),
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "max": float(values.max()),
+        }
+
+    def summary(self) -> Dict:
+        """JSON-serializable snapshot of the recorded metrics."""
+        sizes = np.array(self.batch_sizes, dtype=float).reshape(-1, 2)
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "failed_batches": self.failures,
+            "mean_requests_per_batch": float(sizes[:, 0].mean()) if len(sizes) else 0.0,
+            "mean_smiles_per_batch": float(sizes[:, 1].mean()) if len(sizes) else 0.0,
+            "wait_ms": self._summary(self.wait_ms),
+            "total_ms": self._summary(self.total_ms),
+        }
+
+
+class _Pending:
+    __slots__ = ("smiles", "future", "enqueued")
+
+    def __init__(self, smiles: List[str], future: asyncio.Future):
+        self.smiles = smiles
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class RequestCoalescer:
+    """
+    Merge concurrent SMILES prediction requests into combined submissions.
+
+    Parameters
+    ----------
+    submit : Callable[[List[str]], Awaitable[List[dict]]]
+        Predicts a list of SMILES, returning rtpred result rows ('index',
+        'smiles', 'retention_time'); SMILES without a row get an empty
+        retention time
+    window_ms : float
+        How long the first request of a batch waits for others to join
+    max_batch : int
+        Maximum number of SMILES per combined submission; a request that would
+        overflow the buffered batch is held for the next one, and a single
+        request larger than max_batch is submitted on its own
+    """
+    def __init__(self, submit: Callable[[List[str]], Awaitable[List[dict]]], window_ms: float = DEFAULT_WINDOW_MS, max_batch: int = DEFAULT_MAX_BATCH):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.submit = submit
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.metrics = LatencyMetrics()
+        self._pending: List[_Pending] = []
+        self._pending_smiles = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+
+    async def predict(self, smiles_list: List[str]) -> List[dict]:
+        """
+        Predict retention times for one request's SMILES via a shared batch.
+
+        Returns one dictionary per input SMILES ('index' is 1-based within
+        this request, as on rtpred.ca).
+        """
+        if not smiles_list:
+            return []
+        loop = asyncio.get_running_loop()
+        entry = _Pending(list(smiles_list), loop.create_future())
+        if self._pending and self._pending_smiles + len(entry.smiles) > self.max_batch:
+            self._flush()
+        self._pending.append(entry)
+        self._pending_smiles += len(entry.smiles)
+
+        if self._pending_smiles >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000.0, self._flush)
+
+        rows, started = await entry.future
+        done = time.perf_counter()
+        self.metrics.record_request((started - entry.enqueued) * 1000.0, (done - entry.enqueued) * 1000.0)
+        return rows
+
+    def _flush(self):
+        """Hand everything buffered so far to a new submission task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_smiles = self._pending, [], 0
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        # Identical SMILES from different requests are uploaded once.
+        unique: Dict[str, int] = {}
+        for entry in batch:
+            for smiles in entry.smiles:
+                unique.setdefault(smiles, len(unique))
+        logger.info(f"Submitting {len(unique)} SMILES for {len(batch)} coalesced requests")
+
+        try:
+            rows = align_result_rows(list(unique), await self.submit(list(unique)))
+        except Exception as e:
+            self.metrics.record_batch(len(batch), len(unique), ok=False)
+            for entry in batch:
+                if not entry.future.done():
+                    entry.future.set_exception(e)
+            return
+
+        self.metrics.record_batch(len(batch), len(unique), ok=True)
+        for entry in batch:
+            if entry.future.done():
+                continue
+            fanned = []
+            for i, smiles in enumerate(entry.smiles):
+                row = rows[unique[smiles]]
+                fanned.append({"index": str(i + 1), "smiles": smiles, "retention_time": row.get("retention_time", "") if row else ""})
+            entry.future.set_result((fanned, started))
+
+    async def drain(self):
+        """Submit anything buffered and wait for in-flight batches."""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
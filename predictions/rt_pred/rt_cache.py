@@ -0,0 +1,48 @@
+"""
+Retention Time Prediction Cache
+
+Persistent SQLite cache of rtpred.ca predictions keyed by canonical SMILES and
+chromatographic method, so compounds that were already predicted never go back
+out to the web server.
+"""
+
+from typing import Dict, Iterable, Optional
+
+try:
+    from predictions.sqlite_cache import SQLiteCache, default_cache_path
+except Exception:  # pragma: no cover - fallback for direct execution
+    from sqlite_cache import SQLiteCache, default_cache_path
+
+
+class RetentionTimeCache:
+    """Retention times keyed by (chromatographic method, canonical SMILES)."""
+    def __init__(self, path: Optional[str] = None, version: str = "1", ttl: Optional[float] = None):
+        self.store = SQLiteCache(path or default_cache_path("rt_pred.sqlite"), table="retention_times", version=version, ttl=ttl)
+
+    @staticmethod
+    def _key(canonical_smiles: str, method: str) -> str:
+        return f"{method}|{canonical_smiles}"
+
+    def get_many(self, canonical_smiles: Iterable[str], method: str) -> Dict[str, str]:
+        """Cached retention times for the given canonical SMILES."""
+        keys = {self._key(s, method): s for s in canonical_smiles}
+        found = self.store.get_many(keys.keys())
+        return {keys[k]: v for k, v in found.items()}
+
+    def set_many(self, retention_times: Dict[str, str], method: str):
+        """Store retention times (as returned by rtpred.ca) per canonical SMILES."""
+        self.store.set_many({self._key(s, method): rt for s, rt in retention_times.items()})
+
+    def __repr__(self):
+        return f"RetentionTimeCache({self.store})"
+
+
+_default_cache: Optional[RetentionTimeCache] = None
+
+
+def get_default_rt_cache() -> RetentionTimeCache:
+    """Process-wide cache in the default cache directory, created on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RetentionTimeCache()
+    return _default_cache
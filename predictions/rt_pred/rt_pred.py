@@ -13,155 +13,109 @@ import asyncio
 import os
 import logging
 import tempfile
-from typing import List
-from pyppeteer import launch
+import threading
+from typing import List, Optional
+
+try:
+    from predictions.mol_cache import canonical_smiles
+    from predictions.rt_pred.browser_pool import LAUNCH_OPTIONS, BrowserPool
+    from predictions.rt_pred.rt_cache import RetentionTimeCache, get_default_rt_cache
+    from predictions.rt_pred.rt_results import align_result_rows
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import canonical_smiles
+    from rt_pred.browser_pool import LAUNCH_OPTIONS, BrowserPool
+    from rt_pred.rt_cache import RetentionTimeCache, get_default_rt_cache
+    from rt_pred.rt_results import align_result_rows
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def predict_retention_time_puppeteer(csv_file_path: str):
+_default_pool: Optional[BrowserPool] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_loop_lock = threading.Lock()
+
+def _shared_pool_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop of the shared browser pool, running on a daemon thread.
+
+    Keeping the pool on its own long-lived loop lets callers that create a new
+    loop per call (e.g. the asyncio.run in ChemicalReaction's sync wrappers)
+    reuse the same warm browser.
+    """
+    global _pool_loop
+    with _pool_loop_lock:
+        if _pool_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="rt-browser-pool", daemon=True).start()
+            _pool_loop = loop
+        return _pool_loop
+
+async def _on_pool_loop(coro):
+    """Run a coroutine on the shared pool loop and await its result from any loop."""
+    loop = _shared_pool_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+async def _start_shared_pool() -> BrowserPool:
+    global _default_pool
+    if _default_pool is None:
+        # Signal handlers can only be installed from the main thread.
+        options = dict(LAUNCH_OPTIONS, handleSIGINT=False, handleSIGTERM=False, handleSIGHUP=False)
+        _default_pool = BrowserPool(size=int(os.environ.get("PEAKPROPHET_RT_POOL_SIZE", "2")), launch_options=options)
+    await _default_pool.start()
+    return _default_pool
+
+async def get_browser_pool() -> BrowserPool:
+    """
+    Shared browser pool, started on first use and kept for the life of the process.
+
+    The pool size is read from PEAKPROPHET_RT_POOL_SIZE (default 2). The pool
+    runs on a background event loop, so its coroutines must be run there
+    (predict_retention_time_puppeteer does this).
+    """
+    return await _on_pool_loop(_start_shared_pool())
+
+async def close_browser_pool():
+    """Close the shared browser pool, if one was started."""
+    global _default_pool
+    if _default_pool is not None:
+        pool, _default_pool = _default_pool, None
+        await _on_pool_loop(pool.close())
+
+async def predict_retention_time_puppeteer(csv_file_path: str, method: str = "CS22", pool: Optional[BrowserPool] = None):
     """
     Use Puppeteer to predict retention times from the rtpred.ca website.
+
+    The submission runs on a warm page of a long-lived browser pool, so only
+    the remote prediction time is paid per call.
     
     Parameters
     ----------
     csv_file_path : str
         Path to the CSV file containing SMILES data
+    method : str
+        Chromatographic method selected on rtpred.ca
+    pool : Optional[BrowserPool]
+        Pool to submit on, owned by the caller's event loop (defaults to the
+        shared pool)
         
     Returns
     -------
     list
         List of dictionaries containing prediction results
     """
-    browser = None
+    async def predict_on_shared_pool():
+        return await (await _start_shared_pool()).predict(csv_file_path, method)
+
     try:
-        # Launch browser with appropriate options for headless operation
-        # These options work on both Mac and Linux servers
-        browser = await launch({
-            'headless': True,
-            'args': [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
-                '--no-first-run',
-                '--no-zygote',
-                '--disable-gpu',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor'
-            ]
-        })
-        
-        page = await browser.newPage()
-        
-        # Set viewport
-        await page.setViewport({'width': 1280, 'height': 720})
-        
-        # Navigate to the website
-        logger.info("Navigating to rtpred.ca...")
-        await page.goto('https://rtpred.ca/predict/', {'waitUntil': 'networkidle0'})
-        
-        # Wait for the page to load
-        await page.waitForSelector('#selected_CM', {'timeout': 10000})
-        
-        # Select "CS22" from the dropdown
-        logger.info("Selecting CS22 method...")
-        await page.select('#selected_CM', 'CS22')
-        
-        # Wait for file input to be available
-        await page.waitForSelector('#csv_input_predict', {'timeout': 5000})
-        
-        # Upload the CSV file
-        logger.info(f"Uploading file: {csv_file_path}")
-        file_input = await page.querySelector('#csv_input_predict')
-        await file_input.uploadFile(csv_file_path)
-        
-        # Click the submit button
-        logger.info("Submitting prediction request...")
-        
-        # Try multiple methods to find the submit button
-        submit_button = None
-        
-        # Method 1: Try CSS selector
-        try:
-            submit_button = await page.querySelector("button[type='submit']")
-        except:
-            pass
-            
-        # Method 2: Try XPath using evaluateHandle
-        if not submit_button:
-            try:
-                submit_button = await page.evaluateHandle('''
-                    () => {
-                        const xpath = "//button[normalize-space()='Submit']";
-                        const result = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-                        return result.singleNodeValue;
-                    }
-                ''')
-            except:
-                pass
-                
-        # Method 3: Find by text content
-        if not submit_button:
-            try:
-                submit_button = await page.evaluateHandle('''
-                    () => {
-                        const buttons = document.querySelectorAll('button');
-                        for (const button of buttons) {
-                            if (button.textContent.trim() === 'Submit') {
-                                return button;
-                            }
-                        }
-                        return null;
-                    }
-                ''')
-            except:
-                pass
-        
-        # Click the button if found
-        if submit_button:
-            try:
-                await submit_button.click()
-                logger.info("Submit button clicked successfully")
-            except Exception as e:
-                logger.error(f"Error clicking submit button: {e}")
-                raise Exception("Submit button found but could not be clicked")
-        else:
-            raise Exception("Submit button not found")
-        
-        # Wait for results table to appear
-        logger.info("Waiting for results...")
-        await page.waitForSelector('#new_pred table tbody', {'timeout': 30000})
-        
-        # Extract results from the table
-        results = await page.evaluate('''
-            () => {
-                const rows = document.querySelectorAll('#new_pred table tbody tr');
-                const results = [];
-                rows.forEach(row => {
-                    const cols = row.querySelectorAll('td');
-                    if (cols.length >= 3) {
-                        results.push({
-                            index: cols[0].textContent.trim(),
-                            smiles: cols[1].textContent.trim(),
-                            retention_time: cols[2].textContent.trim()
-                        });
-                    }
-                });
-                return results;
-            }
-        ''')
-        
-        logger.info(f"Extracted {len(results)} predictions")
-        return results
-        
+        if pool is not None:
+            return await pool.predict(csv_file_path, method)
+        return await _on_pool_loop(predict_on_shared_pool())
     except Exception as e:
         logger.error(f"Error during prediction: {e}")
         raise e
-    finally:
-        if browser:
-            await browser.close()
 
 def _write_smiles_to_temp_csv(smiles_list: List[str]) -> str:
     """
@@ -187,30 +141,82 @@ def _write_smiles_to_temp_csv(smiles_list: List[str]) -> str:
     finally:
         temp_file.close()
 
-async def predict_retention_time_from_smiles(smiles_list: List[str]):
+async def _predict_uncached(smiles_list: List[str], method: str):
+    """Submit SMILES to rtpred.ca in one temporary CSV upload."""
+    csv_path = _write_smiles_to_temp_csv(smiles_list)
+    try:
+        return await predict_retention_time_puppeteer(csv_path, method=method)
+    finally:
+        # Clean up the temporary CSV file
+        try:
+            os.unlink(csv_path)
+        except OSError:
+            pass
+
+async def predict_retention_time_from_smiles(smiles_list: List[str], method: str = "CS22", use_cache: bool = True, cache: Optional[RetentionTimeCache] = None):
     """
-    Predict retention times given a list of SMILES. This creates a temporary CSV
-    with one SMILES per line (no header) and submits it to rtpred.ca.
+    Predict retention times given a list of SMILES. Cached predictions are looked
+    up by canonical SMILES and method; only the remaining unique compounds are
+    written to a temporary CSV (one SMILES per line, no header) and submitted to
+    rtpred.ca, and their results are stored in the cache.
 
     Parameters
     ----------
     smiles_list : List[str]
         List of SMILES strings
+    method : str
+        Chromatographic method selected on rtpred.ca
+    use_cache : bool
+        Whether to read from and write to the persistent cache
+    cache : Optional[RetentionTimeCache]
+        Cache to use instead of the default one
 
     Returns
     -------
     list
-        List of dictionaries containing prediction results
+        List of dictionaries containing prediction results, in input order
+        ('index' is the position in smiles_list)
     """
-    csv_path = _write_smiles_to_temp_csv(smiles_list)
-    try:
-        return await predict_retention_time_puppeteer(csv_path)
-    finally:
-        # Clean up the temporary CSV file
-        try:
-            os.unlink(csv_path)
-        except OSError:
-            pass
+    if not use_cache:
+        rows = align_result_rows(smiles_list, await _predict_uncached(smiles_list, method))
+        return [
+            {"index": str(i), "smiles": smiles, "retention_time": row.get("retention_time", "") if row else ""}
+            for i, (smiles, row) in enumerate(zip(smiles_list, rows))
+        ]
+    cache = cache or get_default_rt_cache()
+
+    # Unparseable SMILES are passed through verbatim and cached under that spelling.
+    keys = [canonical_smiles(s) or s for s in smiles_list]
+    known = cache.get_many(keys, method)
+
+    # One representative input spelling per missing compound, in first-seen order.
+    missing = {}
+    for smiles, key in zip(smiles_list, keys):
+        if key not in known and key not in missing:
+            missing[key] = smiles
+
+    if missing:
+        logger.info(f"{len(known)} retention times cached, predicting {len(missing)}")
+        submitted = list(missing.values())
+        fresh = await _predict_uncached(submitted, method)
+        predicted = {}
+        for key, row in zip(missing.keys(), align_result_rows(submitted, fresh)):
+            rt = row.get("retention_time") if row else None
+            if rt not in (None, ""):
+                predicted[key] = rt
+        if len(fresh) == len(submitted):
+            cache.set_many(predicted, method)
+        else:
+            # A short or padded result table may be misaligned; use it for this call only.
+            logger.warning(f"rtpred returned {len(fresh)} rows for {len(submitted)} SMILES; not caching this batch")
+        known.update(predicted)
+    else:
+        logger.info(f"All {len(keys)} retention times served from cache")
+
+    return [
+        {"index": str(i), "smiles": smiles, "retention_time": known.get(key, "")}
+        for i, (smiles, key) in enumerate(zip(smiles_list, keys))
+    ]
 
 async def main():
     """Main function to test the retention time prediction."""
@@ -226,6 +232,8 @@ async def main():
             
     except Exception as e:
         logger.error(f"Prediction failed: {e}")
+    finally:
+        await close_browser_pool()
 
 if __name__ == "__main__":
     asyncio.run(main())
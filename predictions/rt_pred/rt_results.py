@@ -0,0 +1,70 @@
+"""
+Retention Time Result Alignment
+
+rtpred.ca returns one table row per compound it could predict, each with its
+1-based index in the uploaded CSV and the SMILES it read. Rows can be missing
+(e.g. for SMILES rtpred rejects), so results are matched back to the submitted
+SMILES by index and SMILES rather than by position.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+try:
+    from predictions.mol_cache import canonical_smiles
+except Exception:  # pragma: no cover - fallback for direct execution
+    from mol_cache import canonical_smiles
+
+logger = logging.getLogger(__name__)
+
+
+def _same_compound(submitted: str, returned: str) -> bool:
+    if not returned or returned == submitted:
+        return True
+    canonical = canonical_smiles(submitted)
+    return canonical is not None and canonical == canonical_smiles(returned)
+
+
+def align_result_rows(smiles_list: List[str], rows: List[dict]) -> List[Optional[dict]]:
+    """
+    The result row of each submitted SMILES, or None where rtpred returned none.
+
+    A row is matched by its 'index' when the SMILES at that position agrees
+    with the row's 'smiles' (exactly or after canonicalization), and otherwise
+    by its SMILES alone. Rows matching no submitted compound are dropped.
+    """
+    aligned: List[Optional[dict]] = [None] * len(smiles_list)
+    unmatched: List[dict] = []
+    for row in rows:
+        try:
+            position = int(str(row.get("index", "")).strip()) - 1
+        except ValueError:
+            position = -1
+        if 0 <= position < len(smiles_list) and aligned[position] is None and _same_compound(smiles_list[position], row.get("smiles", "")):
+            aligned[position] = row
+        else:
+            unmatched.append(row)
+
+    if unmatched:
+        # Open positions by submitted and canonical SMILES, in submission order.
+        open_positions: Dict[str, List[int]] = {}
+        for position, smiles in enumerate(smiles_list):
+            if aligned[position] is None:
+                open_positions.setdefault(smiles, []).append(position)
+                canonical = canonical_smiles(smiles)
+                if canonical is not None and canonical != smiles:
+                    open_positions.setdefault(canonical, []).append(position)
+        for row in unmatched:
+            returned = row.get("smiles", "")
+            candidates = open_positions.get(returned) or open_positions.get(canonical_smiles(returned) or returned) or []
+            while candidates and aligned[candidates[0]] is not None:
+                candidates.pop(0)
+            if candidates:
+                aligned[candidates.pop(0)] = row
+            else:
+                logger.warning(f"Dropping rtpred row that matches no submitted SMILES: {row}")
+
+    missing = sum(row is None for row in aligned)
+    if missing:
+        logger.warning(f"rtpred returned no result for {missing} of {len(smiles_list)} SMILES")
+    return aligned
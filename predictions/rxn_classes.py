@@ -1,27 +1,30 @@
 from typing import List, Optional, Dict
 import asyncio
 
+import numpy as np
+
 # Handle imports whether this file is imported as part of the package or run directly
 try:
-    from predictions.askcos_scraper import scrape_askcos
-    from predictions.rt_pred.rt_pred import predict_retention_time_from_smiles
-    from predictions.lmax_pred.lmax_pred import predict_lambda_max_in_conda_env
-    from predictions.ms_pred.ms_pred import predict_ms_adducts
+    from predictions.forward_backends import ForwardBackend, get_forward_backend
+    from predictions.rt_pred.backends import RTBackend, get_rt_backend
+    from predictions.lmax_pred.lmax_pred import LambdaMaxMatrix, predict_lambda_max_matrix, predict_lambda_max_with_uncertainty
+    from predictions.ms_pred.ms_pred import predict_ms_adduct_table
 except Exception:  # pragma: no cover - fallback for direct execution
-    from askcos_scraper import scrape_askcos
-    from rt_pred.rt_pred import predict_retention_time_from_smiles
-    from lmax_pred.lmax_pred import predict_lambda_max_in_conda_env
-    from ms_pred.ms_pred import predict_ms_adducts
+    from forward_backends import ForwardBackend, get_forward_backend
+    from rt_pred.backends import RTBackend, get_rt_backend
+    from lmax_pred.lmax_pred import LambdaMaxMatrix, predict_lambda_max_matrix, predict_lambda_max_with_uncertainty
+    from ms_pred.ms_pred import predict_ms_adduct_table
 
 class PredictedProduct:
     """Represents a predicted product of a reaction."""
-    def __init__(self, smiles: str, probability: float, mol_weight: float, ms_values:  Optional[Dict[float, float]] = None, retention_time: Optional[float] = None, lambda_max: Optional[float] = None):
+    def __init__(self, smiles: str, probability: float, mol_weight: float, ms_values:  Optional[Dict[float, float]] = None, retention_time: Optional[float] = None, lambda_max: Optional[float] = None, lambda_max_std: Optional[float] = None):
         self.smiles = smiles
         self.probability = probability
         self.mol_weight = mol_weight
         self.ms_values = ms_values
         self.retention_time = retention_time
         self.lambda_max = lambda_max
+        self.lambda_max_std = lambda_max_std
 
     def set_smiles(self, smiles: str):
         self.smiles = smiles
@@ -59,6 +62,12 @@ class PredictedProduct:
     def get_lambda_max(self) -> float:
         return self.lambda_max
 
+    def set_lambda_max_std(self, lambda_max_std: float):
+        self.lambda_max_std = lambda_max_std
+
+    def get_lambda_max_std(self) -> float:
+        return self.lambda_max_std
+
     def __repr__(self):
         ms_info = f", MS={len(self.ms_values)} adducts" if self.ms_values else ", MS=None"
         return f"PredictedProduct(smiles='{self.smiles}', RT={self.retention_time}, λmax={self.lambda_max}{ms_info})"
@@ -70,6 +79,8 @@ class ChemicalReaction:
         self.reactants = reactants
         self.solvents = solvents
         self.products = []
+        self.ms_adduct_table = None
+        self.lambda_max_matrix = None
     
     def set_reactants(self, reactants: List[str]):
         self.reactants = reactants
@@ -89,12 +100,16 @@ class ChemicalReaction:
     def get_products(self) -> List[PredictedProduct]:
         return self.products
 
-    async def fetch_products_from_askcos(self) -> List[PredictedProduct]:
-        """Call ASKCOS scraper to predict products and populate self.products.
+    async def fetch_products_from_askcos(self, use_cache: bool = True, backend: Optional[ForwardBackend] = None) -> List[PredictedProduct]:
+        """Predict products with the forward backend and populate self.products.
 
-        Returns the list of added products.
+        Uses `backend` if given, otherwise the backend configured by
+        PEAKPROPHET_FORWARD_BACKEND (the ASKCOS scraper by default, whose
+        persistent cache is skipped if use_cache is False). Returns the list
+        of added products.
         """
-        results = await scrape_askcos(self.reactants, self.solvents)
+        backend = backend or get_forward_backend(use_cache=use_cache)
+        results = await backend.predict(self.reactants, self.solvents)
         self.products = []
         for item in results:
             try:
@@ -106,7 +121,7 @@ class ChemicalReaction:
             self.add_product(PredictedProduct(smiles=smiles, probability=probability, mol_weight=mol_weight))
         return self.products
 
-    def fetch_products_from_askcos_sync(self) -> List[PredictedProduct]:
+    def fetch_products_from_askcos_sync(self, use_cache: bool = True, backend: Optional[ForwardBackend] = None) -> List[PredictedProduct]:
         """Synchronous wrapper for fetch_products_from_askcos.
 
         Uses asyncio.run if no running loop is present; otherwise raises RuntimeError
@@ -115,33 +130,29 @@ class ChemicalReaction:
         try:
             asyncio.get_running_loop()
         except RuntimeError:
-            return asyncio.run(self.fetch_products_from_askcos())
+            return asyncio.run(self.fetch_products_from_askcos(use_cache=use_cache, backend=backend))
         raise RuntimeError("fetch_products_from_askcos_sync() cannot run inside an existing event loop. Use the async method instead.")
 
-    async def predict_products_retention_times(self) -> List[PredictedProduct]:
+    async def predict_products_retention_times(self, backend: Optional[RTBackend] = None) -> List[PredictedProduct]:
         """Predict retention times for current products and set them in-place.
 
+        Uses the given RTBackend, or the configured one (see get_rt_backend).
         Returns the updated list of products.
         """
         if not self.products:
             return self.products
         smiles_list = [p.get_smiles() for p in self.products]
         try:
-            results = await predict_retention_time_from_smiles(smiles_list)
+            backend = backend or get_rt_backend()
+            results = await backend.predict(smiles_list)
         except Exception:
             # If prediction fails, leave retention times as-is
             return self.products
-        for idx, product in enumerate(self.products):
-            try:
-                result = results[idx]
-                rt_value = result.get("retention_time")
-                rt_float = float(rt_value) if rt_value not in (None, "") else None
-                product.set_retention_time(rt_float)
-            except Exception:
-                continue
+        for product, rt_value in zip(self.products, results):
+            product.set_retention_time(rt_value)
         return self.products
 
-    def predict_products_retention_times_sync(self) -> List[PredictedProduct]:
+    def predict_products_retention_times_sync(self, backend: Optional[RTBackend] = None) -> List[PredictedProduct]:
         """Synchronous wrapper for predict_products_retention_times.
 
         Uses asyncio.run if no running loop is present; otherwise raises RuntimeError
@@ -150,36 +161,60 @@ class ChemicalReaction:
         try:
             asyncio.get_running_loop()
         except RuntimeError:
-            return asyncio.run(self.predict_products_retention_times())
+            return asyncio.run(self.predict_products_retention_times(backend))
         raise RuntimeError("predict_products_retention_times_sync() cannot run inside an existing event loop. Use the async method instead.")
 
-    def predict_products_lambda_max(self, conda_env: str = "uvvismlenv") -> List[PredictedProduct]:
-        """Predict lambda max for current products (uses conda env via `conda run`).
+    def predict_products_lambda_max(self, conda_env: str = "uvvismlenv", use_server: Optional[bool] = None) -> List[PredictedProduct]:
+        """Predict lambda max (ensemble mean and standard deviation) for current products.
 
-        Builds a list of (smiles, solvent) tuples and invokes the chemprop-based
-        predictor in the specified conda environment, then sets lambda_max on
+        Builds a list of (smiles, solvent) tuples and sends them to the resident
+        chemprop server in the specified conda environment (started on demand),
+        falling back to a single `conda run` of the same ensemble if the
+        server is unavailable or disabled (use_server=False or
+        PEAKPROPHET_CHEMPROP_SERVER=0). Sets lambda_max and lambda_max_std on
         each product when available.
         """
         if not self.products:
             return self.products
         tuples = [(p.get_smiles(), self.get_solvents()) for p in self.products]
-        predictions = predict_lambda_max_in_conda_env(tuples, conda_env=conda_env)
+        predictions = predict_lambda_max_with_uncertainty(tuples, conda_env=conda_env, use_server=use_server)
         for product in self.products:
             key = (product.get_smiles(), self.get_solvents())
             if key in predictions:
                 try:
-                    lm = predictions[key]
-                    lm_float = float(lm) if lm is not None and lm != "" else None
-                    product.set_lambda_max(lm_float)
+                    mean, std = predictions[key]
+                    product.set_lambda_max(float(mean))
+                    product.set_lambda_max_std(float(std))
                 except Exception:
                     continue
         return self.products
 
-    def predict_products_ms_adducts(self) -> List[PredictedProduct]:
+    def predict_products_lambda_max_matrix(self, solvents: Optional[List[str]] = None, fractions=None, conda_env: str = "uvvismlenv", use_server: Optional[bool] = None) -> LambdaMaxMatrix:
+        """Predict lambda max of every product in several solvents in one inference pass.
+
+        `solvents` defaults to this reaction's solvent. Returns the product-by-solvent
+        LambdaMaxMatrix (also kept on self.lambda_max_matrix). If `fractions` is
+        given (aligned with solvents, or a {solvent: fraction} dict), lambda_max and
+        lambda_max_std of each product are set to the fraction-weighted mixture value.
+        """
+        solvents = list(solvents) if solvents else [self.get_solvents()]
+        matrix = predict_lambda_max_matrix([p.get_smiles() for p in self.products], solvents, conda_env=conda_env, use_server=use_server)
+        self.lambda_max_matrix = matrix
+        if fractions is not None and self.products:
+            mean, std = matrix.mixture(fractions)
+            for product, m, s in zip(self.products, mean.tolist(), std.tolist()):
+                if np.isfinite(m):
+                    product.set_lambda_max(m)
+                    product.set_lambda_max_std(s)
+        return matrix
+
+    def predict_products_ms_adducts(self, profile=None) -> List[PredictedProduct]:
         """Predict mass spectrometry adducts for current products.
         
         Calls the MS adduct prediction function and sets ms_values on each product.
-        Returns the updated list of products.
+        An optional IonizationProfile prunes and re-weights the adducts.
+        The columnar table (rows indexed by product position) is kept on
+        self.ms_adduct_table. Returns the updated list of products.
         """
         if not self.products:
             return self.products
@@ -187,8 +222,9 @@ class ChemicalReaction:
         # Get SMILES list from all products
         smiles_list = [p.get_smiles() for p in self.products]
         
-        # Predict MS adducts for all SMILES
-        ms_predictions = predict_ms_adducts(smiles_list)
+        # Predict MS adducts for all SMILES in one batch
+        self.ms_adduct_table = predict_ms_adduct_table(smiles_list, profile=profile)
+        ms_predictions = self.ms_adduct_table.to_dict()
         
         # Update each product with its MS adduct predictions
         for product in self.products:
@@ -0,0 +1,113 @@
+"""
+Persistent key/value cache backed by SQLite.
+
+Shared by the prediction modules to keep expensive results (molecule
+properties, web predictions, model outputs) across runs. Values are stored as
+JSON; entries carry a version tag and creation time so callers can invalidate
+them by bumping the version or setting a time-to-live. Each operation opens its
+own connection, so one cache file can be used from several threads and
+processes at once.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+def default_cache_path(filename: str) -> str:
+    """Path of a cache file in $PEAKPROPHET_CACHE_DIR (default ~/.cache/peak_prophet)."""
+    cache_dir = os.environ.get("PEAKPROPHET_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "peak_prophet"))
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, filename)
+
+
+class SQLiteCache:
+    """JSON key/value store in one SQLite table."""
+
+    # SQLite limits the number of bound parameters per statement.
+    _CHUNK = 500
+
+    def __init__(self, path: str, table: str = "cache", version: str = "1", ttl: Optional[float] = None):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.path = path
+        self.table = table
+        self.version = str(version)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, version TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connection that commits on success and is always closed."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _is_fresh(self, version: str, created: float, now: float) -> bool:
+        if version != self.version:
+            return False
+        return self.ttl is None or now - created <= self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        """Value stored for key, or None if missing, stale or from another version."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Fresh values for the keys that are present."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            for start in range(0, len(keys), self._CHUNK):
+                chunk = keys[start:start + self._CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value, version, created FROM {self.table} WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, value, version, created in rows:
+                    if self._is_fresh(version, created, now):
+                        found[key] = json.loads(value)
+        return found
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]):
+        """Insert or replace values (stamped with the current version and time)."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, json.dumps(value), self.version, now) for key, value in items.items()]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, version, created) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def clear(self):
+        """Remove every entry of this table."""
+        with self._lock, self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock, self._connect() as conn:
+            return int(conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0])
+
+    def __repr__(self):
+        return f"SQLiteCache(path='{self.path}', table='{self.table}', version='{self.version}', ttl={self.ttl})"
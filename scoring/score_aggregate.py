@@ -2,7 +2,8 @@
 Aggregate scoring utilities.
 
 Build a weighted aggregate score matrix for predicted vs observed peaks and
-optionally compute an optimal assignment (Hungarian algorithm).
+optionally compute an optimal assignment (Hungarian algorithm, a sparse
+gated solver for large libraries, or a greedy fallback).
 """
 
 from __future__ import annotations
@@ -11,15 +12,121 @@ from typing import List, Tuple, Optional, Dict
 import numpy as np
 
 from .score_ms import cosine_similarity_aligned
-from .score_rt import gaussian_rt_score
-from .score_lmax import gaussian_lmax_score
 
 try:
     from scipy.optimize import linear_sum_assignment
+    from scipy.sparse import csr_matrix, issparse
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
     _HAS_SCIPY = True
 except Exception:
     _HAS_SCIPY = False
 
+    def issparse(x) -> bool:
+        return False
+
+
+def build_component_matrices(
+    preds: List[Dict],
+    obs: List[Dict],
+    mz_tol: float = 0.01,
+    ppm: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Build the per-criterion matrices that the aggregate score is assembled from.
+
+    Returns a dict of arrays with shape [len(preds), len(obs)]:
+    'ms' (cosine similarity), 'rt_delta' and 'lmax_delta' (absolute differences),
+    plus boolean 'ms_mask', 'rt_mask' and 'lmax_mask' marking which pairs
+    carry each criterion, and 'lmax_std' with shape [len(preds), 1] holding each
+    prediction's λmax uncertainty (pred key 'lmax_std', 0 if absent). These do
+    not depend on weights or sigmas, so they can be computed once and
+    recombined cheaply (see combine_component_matrices).
+    """
+    P = len(preds)
+    O = len(obs)
+    ms = np.zeros((P, O), dtype=float)
+    ms_mask = np.zeros((P, O), dtype=bool)
+
+    for i, p in enumerate(preds):
+        if "mz" not in p or "intensity" not in p:
+            continue
+        for j, o in enumerate(obs):
+            if "mz" in o and "intensity" in o:
+                ms[i, j] = cosine_similarity_aligned(p["mz"], p["intensity"], o["mz"], o["intensity"], mz_tol=mz_tol, ppm=ppm)
+                ms_mask[i, j] = True
+
+    rt_delta, rt_mask = _delta_matrix(preds, obs, "rt")
+    lmax_delta, lmax_mask = _delta_matrix(preds, obs, "lmax")
+    lmax_std = np.array([0.0 if p.get("lmax_std") is None else float(p["lmax_std"]) for p in preds], dtype=float)
+
+    return {
+        "ms": ms,
+        "ms_mask": ms_mask,
+        "rt_delta": rt_delta,
+        "rt_mask": rt_mask,
+        "lmax_delta": lmax_delta,
+        "lmax_mask": lmax_mask,
+        "lmax_std": np.nan_to_num(lmax_std).reshape(-1, 1),
+    }
+
+
+def _delta_matrix(preds: List[Dict], obs: List[Dict], key: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Absolute difference matrix for a scalar key and the mask of defined pairs."""
+    p_vals = np.array([np.nan if p.get(key) is None else float(p[key]) for p in preds], dtype=float)
+    o_vals = np.array([np.nan if o.get(key) is None else float(o[key]) for o in obs], dtype=float)
+    mask = ~np.isnan(p_vals)[:, None] & ~np.isnan(o_vals)[None, :]
+    delta = np.where(mask, np.abs(p_vals[:, None] - o_vals[None, :]), 0.0)
+    return delta, mask
+
+
+def gaussian_kernel(delta: np.ndarray, sigma: float | np.ndarray) -> np.ndarray:
+    """Vectorized Gaussian similarity exp(-0.5 * (delta / sigma)^2).
+
+    `sigma` may be a scalar or any array broadcastable against `delta`;
+    entries with sigma <= 0 score 0, matching gaussian_rt_score/gaussian_lmax_score.
+    """
+    delta = np.asarray(delta, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    safe = np.where(sigma > 0, sigma, 1.0)
+    return np.where(sigma > 0, np.exp(-0.5 * (delta / safe) ** 2), 0.0)
+
+
+def effective_sigma(sigma: float | np.ndarray, std: float | np.ndarray) -> np.ndarray:
+    """Kernel width widened by a prediction's uncertainty, sqrt(sigma^2 + std^2).
+
+    Non-positive sigmas are kept as they are, so a disabled criterion stays disabled.
+    """
+    sigma = np.asarray(sigma, dtype=float)
+    std = np.asarray(std, dtype=float)
+    return np.where(sigma > 0, np.sqrt(sigma ** 2 + std ** 2), sigma)
+
+
+def combine_component_matrices(
+    components: Dict[str, np.ndarray],
+    weights: Dict[str, float] | None = None,
+    rt_sigma: float = 0.5,
+    lmax_sigma: float = 15.0,
+) -> np.ndarray:
+    """
+    Weighted aggregate of component matrices; each entry is normalized by the
+    weights of the criteria available for that pair. The λmax kernel of each
+    prediction uses effective_sigma(lmax_sigma, its 'lmax_std').
+    """
+    if weights is None:
+        weights = {"ms": 0.5, "rt": 0.3, "lmax": 0.2}
+
+    w_ms = weights.get("ms", 0.0)
+    w_rt = weights.get("rt", 0.0)
+    w_lm = weights.get("lmax", 0.0)
+
+    score = (
+        w_ms * components["ms"] * components["ms_mask"]
+        + w_rt * gaussian_kernel(components["rt_delta"], rt_sigma) * components["rt_mask"]
+        + w_lm * gaussian_kernel(components["lmax_delta"], effective_sigma(lmax_sigma, components.get("lmax_std", 0.0))) * components["lmax_mask"]
+    )
+    wsum = w_ms * components["ms_mask"] + w_rt * components["rt_mask"] + w_lm * components["lmax_mask"]
+    return np.divide(score, wsum, out=np.zeros_like(score, dtype=float), where=wsum > 0)
+
 
 def build_score_matrix(
     preds: List[Dict],
@@ -33,75 +140,161 @@ def build_score_matrix(
     """
     Build an aggregate score matrix S (shape [len(preds), len(obs)]).
 
-    Each pred dict may contain keys: 'mz', 'intensity', 'rt', 'lmax'.
-    Each obs dict may contain the same keys.
+    Each pred dict may contain keys: 'mz', 'intensity', 'rt', 'lmax', 'lmax_std'.
+    Each obs dict may contain the same keys (except 'lmax_std').
     """
-    if weights is None:
-        weights = {"ms": 0.5, "rt": 0.3, "lmax": 0.2}
+    components = build_component_matrices(preds, obs, mz_tol=mz_tol, ppm=ppm)
+    return combine_component_matrices(components, weights=weights, rt_sigma=rt_sigma, lmax_sigma=lmax_sigma)
 
-    P = len(preds)
-    O = len(obs)
-    S = np.zeros((P, O), dtype=float)
 
-    for i, p in enumerate(preds):
-        for j, o in enumerate(obs):
-            score = 0.0
-            wsum = 0.0
-            # MS score
-            if "mz" in p and "intensity" in p and "mz" in o and "intensity" in o:
-                ms = cosine_similarity_aligned(p["mz"], p["intensity"], o["mz"], o["intensity"], mz_tol=mz_tol, ppm=ppm)
-                score += weights.get("ms", 0.0) * ms
-                wsum += weights.get("ms", 0.0)
-            # RT score
-            if p.get("rt") is not None and o.get("rt") is not None:
-                rt = gaussian_rt_score(float(p["rt"]), float(o["rt"]), sigma=rt_sigma)
-                score += weights.get("rt", 0.0) * rt
-                wsum += weights.get("rt", 0.0)
-            # Lmax score
-            if p.get("lmax") is not None and o.get("lmax") is not None:
-                lm = gaussian_lmax_score(float(p["lmax"]), float(o["lmax"]), sigma=lmax_sigma)
-                score += weights.get("lmax", 0.0) * lm
-                wsum += weights.get("lmax", 0.0)
-
-            S[i, j] = (score / wsum) if wsum > 0 else 0.0
-    return S
-
-
-def optimal_assignment(score_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+def optimal_assignment(
+    score_matrix,
+    min_score: Optional[float] = None,
+    method: str = "auto",
+) -> Tuple[np.ndarray, np.ndarray, float]:
     """
     Compute optimal 1-1 assignment that maximizes total aggregate score using Hungarian method.
     Returns row_indices, col_indices, total_score.
-    If SciPy is not available, fall back to greedy matching.
+
+    If `min_score` is given, pairs scoring below it are never assigned and rows or
+    columns may be left unassigned. `method` is one of 'auto', 'hungarian' (dense,
+    SciPy), 'sparse' (gated edge list, SciPy) or 'greedy'. 'auto' uses the sparse
+    solver for SciPy sparse input, Hungarian otherwise, and falls back to greedy
+    matching if SciPy is not available.
     """
-    S = np.asarray(score_matrix, dtype=float)
+    if method == "auto":
+        if not _HAS_SCIPY:
+            method = "greedy"
+        elif issparse(score_matrix):
+            method = "sparse"
+        else:
+            method = "hungarian"
+
+    if method == "greedy":
+        return greedy_assignment(score_matrix, min_score=min_score)
+    if method == "sparse":
+        return sparse_assignment(score_matrix, min_score=min_score)
+    if method != "hungarian":
+        raise ValueError(f"Unknown assignment method: {method}")
+    if not _HAS_SCIPY:
+        raise ImportError("method='hungarian' requires SciPy")
+
+    S = score_matrix.toarray() if issparse(score_matrix) else np.asarray(score_matrix, dtype=float)
     if S.size == 0:
         return np.array([], dtype=int), np.array([], dtype=int), 0.0
 
-    if _HAS_SCIPY:
+    if min_score is None:
         # Hungarian solves a minimization; convert to cost as (1 - score)
         cost = 1.0 - S
         r, c = linear_sum_assignment(cost)
         total = float(S[r, c].sum())
         return r, c, total
 
-    # Greedy fallback: repeatedly pick best remaining pair
-    S_copy = S.copy()
+    # Gated pairs carry zero weight, so they never improve the total and are
+    # dropped afterwards; what remains is a maximum-weight (partial) matching.
+    allowed = S >= min_score
+    r, c = linear_sum_assignment(np.where(allowed, S, 0.0), maximize=True)
+    keep = allowed[r, c]
+    r, c = r[keep], c[keep]
+    return r, c, float(S[r, c].sum())
+
+
+def _gated_edges(score_matrix, min_score: Optional[float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Tuple[int, int]]:
+    """Edge list (rows, cols, scores) of assignable pairs.
+
+    Without `min_score`, only positive scores are kept. Sparse input keeps its
+    stored entries (subject to the same gate).
+    """
+    if _HAS_SCIPY and issparse(score_matrix):
+        coo = score_matrix.tocoo()
+        r, c, w = coo.row.astype(int), coo.col.astype(int), coo.data.astype(float)
+        shape = coo.shape
+    else:
+        S = np.asarray(score_matrix, dtype=float)
+        shape = S.shape
+        if S.size == 0:
+            return np.array([], dtype=int), np.array([], dtype=int), np.array([], dtype=float), shape
+        r, c = np.nonzero(S > 0 if min_score is None else S >= min_score)
+        return r, c, S[r, c], shape
+
+    keep = w > 0 if min_score is None else w >= min_score
+    return r[keep], c[keep], w[keep], shape
+
+
+def greedy_assignment(score_matrix, min_score: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Greedy 1-1 matching: sort the edge list once by descending score and sweep it,
+    taking each pair whose row and column are still free.
+    """
+    r, c, w, shape = _gated_edges(score_matrix, min_score)
+    if w.size == 0:
+        return np.array([], dtype=int), np.array([], dtype=int), 0.0
+
+    order = np.argsort(-w, kind="stable")
+    row_used = np.zeros(shape[0], dtype=bool)
+    col_used = np.zeros(shape[1], dtype=bool)
+    limit = min(shape)
+
     rows = []
     cols = []
     total = 0.0
-    while True:
-        idx = np.unravel_index(np.argmax(S_copy), S_copy.shape)
-        i, j = int(idx[0]), int(idx[1])
-        best = float(S_copy[i, j])
-        if best <= 0:
-            break
+    for i, j, score in zip(r[order].tolist(), c[order].tolist(), w[order].tolist()):
+        if row_used[i] or col_used[j]:
+            continue
+        row_used[i] = True
+        col_used[j] = True
         rows.append(i)
         cols.append(j)
-        total += best
-        S_copy[i, :] = -np.inf
-        S_copy[:, j] = -np.inf
-        if not np.isfinite(S_copy).any():
+        total += score
+        if len(rows) == limit:
             break
     return np.array(rows, dtype=int), np.array(cols, dtype=int), total
 
 
+def sparse_assignment(score_matrix, min_score: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Maximum-weight 1-1 matching over a gated sparse edge list.
+
+    Accepts a dense array or a SciPy sparse matrix; only pairs above the gate are
+    materialized, so cost scales with the number of plausible pairs rather than
+    the full matrix. Each row gets a private zero-score dummy column, which lets
+    rows stay unassigned and guarantees a full matching exists for SciPy's
+    sparse LAPJV solver. Falls back to greedy matching without SciPy.
+    """
+    if not _HAS_SCIPY:
+        return greedy_assignment(score_matrix, min_score=min_score)
+
+    r, c, w, shape = _gated_edges(score_matrix, min_score)
+    if w.size == 0:
+        return np.array([], dtype=int), np.array([], dtype=int), 0.0
+
+    transpose = shape[0] > shape[1]
+    if transpose:
+        r, c = c, r
+        shape = (shape[1], shape[0])
+    n_rows, n_cols = shape
+
+    # Minimize (offset - score); dummies cost `offset`, so every real edge with a
+    # positive score beats leaving the row unassigned. All costs stay > 0 because
+    # explicit zeros are not treated as edges.
+    offset = float(w.max()) + 1.0
+    dummy = np.arange(n_rows)
+    biadjacency = csr_matrix(
+        (
+            np.concatenate([offset - w, np.full(n_rows, offset)]),
+            (np.concatenate([r, dummy]), np.concatenate([c, n_cols + dummy])),
+        ),
+        shape=(n_rows, n_cols + n_rows),
+    )
+    rows, cols = min_weight_full_bipartite_matching(biadjacency)
+
+    real = cols < n_cols
+    rows, cols = rows[real].astype(int), cols[real].astype(int)
+
+    lookup = dict(zip(zip(r.tolist(), c.tolist()), w.tolist()))
+    total = float(sum(lookup[(i, j)] for i, j in zip(rows.tolist(), cols.tolist())))
+    if transpose:
+        rows, cols = cols, rows
+        order = np.argsort(rows)
+        rows, cols = rows[order], cols[order]
+    return rows, cols, total
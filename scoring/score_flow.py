@@ -0,0 +1,259 @@
+"""
+Capacity-aware assignment utilities.
+
+Many-to-one matching of predictions to observed peaks, for products that split
+into several peaks (tautomers, rotamers, partial deconvolution) and peaks that
+hold several co-eluting products. The problem is solved as a min-cost flow
+
+    source -> prediction i   (capacity pred_capacity[i])
+    prediction i -> peak j   (capacity 1, cost -score[i, j])
+    peak j -> sink           (capacity obs_capacity[j])
+
+with successive shortest paths. With SciPy, the network is expanded into an
+equivalent sparse assignment problem (capacity copies plus a two-node gadget per
+pair) and handed to SciPy's shortest-augmenting-path LAPJVsp solver. Without
+SciPy, a pure-Python solver runs Dijkstra on reduced costs with node potentials
+and augments along every zero-reduced-cost path before the next Dijkstra pass.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import List, Tuple, Optional, Dict, Set
+import numpy as np
+
+from .score_aggregate import _HAS_SCIPY, _gated_edges, sparse_assignment
+
+if _HAS_SCIPY:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+
+def _as_capacity(capacity, n: int, name: str) -> np.ndarray:
+    """Broadcast a scalar or per-node capacity to an int array of length n."""
+    cap = np.broadcast_to(np.asarray(capacity, dtype=int), (n,)).copy()
+    if (cap < 0).any():
+        raise ValueError(f"{name} must be non-negative")
+    return cap
+
+
+def flow_assignment(
+    score_matrix,
+    pred_capacity: int | List[int] | np.ndarray = 1,
+    obs_capacity: int | List[int] | np.ndarray = 1,
+    min_score: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Maximum-score assignment where prediction i may match up to pred_capacity[i]
+    peaks and peak j up to obs_capacity[j] predictions (each pair at most once).
+
+    Only pairs passing the gate (score > 0, or score >= min_score if given) are
+    considered, and augmentation stops as soon as a path no longer increases the
+    total, so capacities are upper bounds rather than quotas.
+    Returns row_indices, col_indices, total_score like optimal_assignment.
+    """
+    r, c, w, shape = _gated_edges(score_matrix, min_score)
+    P, O = shape
+    pcap = _as_capacity(pred_capacity, P, "pred_capacity")
+    ocap = _as_capacity(obs_capacity, O, "obs_capacity")
+    if w.size == 0:
+        return np.array([], dtype=int), np.array([], dtype=int), 0.0
+
+    if not _HAS_SCIPY:
+        return _flow_by_shortest_paths(r, c, w, pcap, ocap)
+    # sparse_assignment only falls back to greedy without SciPy, so the
+    # unit-capacity shortcut is exact here.
+    if (pcap == 1).all() and (ocap == 1).all():
+        return sparse_assignment(score_matrix, min_score=min_score)
+    return _flow_by_assignment(r, c, w, pcap, ocap)
+
+
+def _flow_by_assignment(
+    r: np.ndarray,
+    c: np.ndarray,
+    w: np.ndarray,
+    pcap: np.ndarray,
+    ocap: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Solve the capacitated matching as one sparse assignment problem.
+
+    Rows are capacity copies of each prediction plus one 'b' node per pair;
+    columns are capacity copies of each peak, one 'a' node per pair and a dummy
+    per prediction copy. A pair is used when a prediction copy takes its 'a'
+    node, which forces the pair's 'b' node onto a copy of the peak; otherwise
+    'b' takes its own 'a'. One gadget per pair keeps every pair used at most
+    once, and every row must be matched, so capacities are respected.
+    """
+    E = w.size
+    n_pc = int(pcap.sum())
+    n_oc = int(ocap.sum())
+
+    # Copy k of prediction i / peak j, grouped contiguously per node.
+    pred_start = np.concatenate([[0], np.cumsum(pcap)[:-1]]).astype(int)
+    obs_start = np.concatenate([[0], np.cumsum(ocap)[:-1]]).astype(int)
+
+    row_b = n_pc + np.arange(E)              # 'b' node rows
+    col_a = n_oc + np.arange(E)              # 'a' node columns
+    col_dummy = n_oc + E + np.arange(n_pc)   # dummy per prediction copy
+
+    offset = float(w.max()) + 1.0
+    rows_l, cols_l, gain_l = [], [], []
+
+    # Prediction copy -> 'a' node of each of its pairs (gain = pair score).
+    k_pred = pcap[r]
+    edge_of = np.repeat(np.arange(E), k_pred)
+    copy_rank = np.arange(k_pred.sum()) - np.repeat(np.cumsum(k_pred) - k_pred, k_pred)
+    rows_l.append(pred_start[r][edge_of] + copy_rank)
+    cols_l.append(col_a[edge_of])
+    gain_l.append(w[edge_of])
+
+    # Prediction copy -> its dummy (unused capacity).
+    rows_l.append(np.arange(n_pc))
+    cols_l.append(col_dummy)
+    gain_l.append(np.zeros(n_pc))
+
+    # 'b' node -> own 'a' node (pair unused).
+    rows_l.append(row_b)
+    cols_l.append(col_a)
+    gain_l.append(np.zeros(E))
+
+    # 'b' node -> each copy of the pair's peak (pair used).
+    k_obs = ocap[c]
+    edge_of = np.repeat(np.arange(E), k_obs)
+    copy_rank = np.arange(k_obs.sum()) - np.repeat(np.cumsum(k_obs) - k_obs, k_obs)
+    rows_l.append(row_b[edge_of])
+    cols_l.append(obs_start[c][edge_of] + copy_rank)
+    gain_l.append(np.zeros(edge_of.size))
+
+    biadjacency = csr_matrix(
+        (offset - np.concatenate(gain_l), (np.concatenate(rows_l), np.concatenate(cols_l))),
+        shape=(n_pc + E, n_oc + E + n_pc),
+    )
+    row_ind, col_ind = min_weight_full_bipartite_matching(biadjacency)
+
+    # A pair is used when a prediction copy holds its 'a' node.
+    is_copy = row_ind < n_pc
+    takes_a = (col_ind >= n_oc) & (col_ind < n_oc + E)
+    used_edges = np.sort(col_ind[is_copy & takes_a] - n_oc)
+    rows = r[used_edges].astype(int)
+    cols = c[used_edges].astype(int)
+    order = np.lexsort((cols, rows))
+    rows, cols = rows[order], cols[order]
+    return rows, cols, float(w[used_edges].sum())
+
+
+def _flow_by_shortest_paths(
+    r: np.ndarray,
+    c: np.ndarray,
+    w: np.ndarray,
+    pcap: np.ndarray,
+    ocap: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Successive shortest paths on the flow network (dependency-free fallback)."""
+    P, O = pcap.size, ocap.size
+    # Node ids: source 0, predictions 1..P, peaks P+1..P+O, sink P+O+1.
+    source, sink = 0, P + O + 1
+    n_nodes = P + O + 2
+    out_edges: List[List[Tuple[int, float]]] = [[] for _ in range(P)]
+    for i, j, score in zip(r.tolist(), c.tolist(), w.tolist()):
+        out_edges[i].append((j, score))
+    weight: Dict[Tuple[int, int], float] = {(i, j): s for i, j, s in zip(r.tolist(), c.tolist(), w.tolist())}
+
+    pcap_l = pcap.tolist()
+    ocap_l = ocap.tolist()
+    used = [0] * P
+    load = [0] * O
+    matched: Set[Tuple[int, int]] = set()
+    matched_on_peak: List[Set[int]] = [set() for _ in range(O)]
+
+    def arcs(u: int) -> List[Tuple[int, float]]:
+        """Residual arcs (target, cost) leaving node u."""
+        if u == source:
+            return [(i + 1, 0.0) for i in range(P) if used[i] < pcap_l[i]]
+        if u <= P:
+            i = u - 1
+            return [(P + 1 + j, -s) for j, s in out_edges[i] if (i, j) not in matched]
+        if u == sink:
+            return []
+        j = u - P - 1
+        back = [(i + 1, weight[(i, j)]) for i in matched_on_peak[j]]
+        if load[j] < ocap_l[j]:
+            back.append((sink, 0.0))
+        return back
+
+    # Feasible initial potentials for the all-zero flow (reduced costs >= 0).
+    best_in = np.zeros(O, dtype=float)
+    np.maximum.at(best_in, c, w)
+    pot = [0.0] * (P + 1) + (-best_in).tolist() + [float((-best_in).min())]
+
+    eps = 1e-9
+    while True:
+        # Dijkstra on reduced costs.
+        dist = [np.inf] * n_nodes
+        done = [False] * n_nodes
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            if u == sink:
+                break
+            for v, cost in arcs(u):
+                if done[v]:
+                    continue
+                nd = d + cost + pot[u] - pot[v]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+
+        d_sink = dist[sink]
+        if d_sink == np.inf or d_sink - pot[source] + pot[sink] >= -eps:
+            # No path left, or the cheapest one no longer increases the score.
+            break
+        for v in range(n_nodes):
+            pot[v] += min(dist[v], d_sink)
+
+        # Augment along every zero-reduced-cost path before the next Dijkstra;
+        # all of them are shortest paths for the current potentials.
+        while True:
+            parent = {source: source}
+            stack = [source]
+            found = False
+            while stack and not found:
+                u = stack.pop()
+                for v, cost in arcs(u):
+                    if v in parent or cost + pot[u] - pot[v] > eps:
+                        continue
+                    parent[v] = u
+                    if v == sink:
+                        found = True
+                        break
+                    stack.append(v)
+            if not found:
+                break
+
+            # Push one unit along the path (pair arcs have unit capacity).
+            v = sink
+            while v != source:
+                u = parent[v]
+                if u == source:
+                    used[v - 1] += 1
+                elif v == sink:
+                    load[u - P - 1] += 1
+                elif u <= P:
+                    i, j = u - 1, v - P - 1
+                    matched.add((i, j))
+                    matched_on_peak[j].add(i)
+                else:
+                    i, j = v - 1, u - P - 1
+                    matched.discard((i, j))
+                    matched_on_peak[j].discard(i)
+                v = u
+
+    pairs = sorted(matched)
+    rows = np.array([i for i, _ in pairs], dtype=int)
+    cols = np.array([j for _, j in pairs], dtype=int)
+    total = float(sum(weight[p] for p in pairs))
+    return rows, cols, total
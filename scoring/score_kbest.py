@@ -0,0 +1,145 @@
+"""
+Ranked alternative assignments.
+
+Enumerate the k best 1-1 assignments of a score matrix with Murty's algorithm:
+each solution's space is partitioned into subproblems that force a prefix of its
+pairs and exclude the next one, subproblems are solved with the Hungarian method
+and kept in a priority queue ordered by total score. Subproblems are solved
+lazily: a child is queued under its parent's total (an upper bound on its own)
+and only solved once it reaches the front of the queue, so children that can
+never enter the top k are never solved.
+"""
+
+from __future__ import annotations
+
+import heapq
+from itertools import count
+from typing import List, Tuple, Optional, FrozenSet
+import numpy as np
+
+from .score_aggregate import _HAS_SCIPY
+
+if _HAS_SCIPY:
+    from scipy.optimize import linear_sum_assignment
+
+
+def _solve_subproblem(
+    W: np.ndarray,
+    forced: Tuple[Tuple[int, int], ...],
+    excluded: FrozenSet[Tuple[int, int]],
+) -> Optional[Tuple[np.ndarray, float]]:
+    """Best assignment of W (rows <= cols) given forced and excluded pairs.
+
+    Only the rows and columns left free by `forced` are passed to the solver,
+    so deeper nodes of the partition solve smaller problems. Returns
+    (col_for_row, total) or None if the subproblem is infeasible.
+    """
+    n_rows, n_cols = W.shape
+    col_for_row = np.full(n_rows, -1, dtype=int)
+    row_free = np.ones(n_rows, dtype=bool)
+    col_free = np.ones(n_cols, dtype=bool)
+    for i, j in forced:
+        col_for_row[i] = j
+        row_free[i] = False
+        col_free[j] = False
+
+    free_rows = np.flatnonzero(row_free)
+    free_cols = np.flatnonzero(col_free)
+    if free_rows.size:
+        cost = -W[np.ix_(free_rows, free_cols)]
+        if excluded:
+            row_pos = {int(i): k for k, i in enumerate(free_rows)}
+            col_pos = {int(j): k for k, j in enumerate(free_cols)}
+            for i, j in excluded:
+                if i in row_pos and j in col_pos:
+                    cost[row_pos[i], col_pos[j]] = np.inf
+        try:
+            r, c = linear_sum_assignment(cost)
+        except ValueError:
+            return None
+        if r.size < free_rows.size or not np.isfinite(cost[r, c]).all():
+            return None
+        col_for_row[free_rows[r]] = free_cols[c]
+
+    total = float(W[np.arange(n_rows), col_for_row].sum())
+    return col_for_row, total
+
+
+def k_best_assignments(
+    score_matrix: np.ndarray,
+    k: int = 10,
+    min_score: Optional[float] = None,
+    max_gap: Optional[float] = None,
+) -> List[Tuple[np.ndarray, np.ndarray, float]]:
+    """
+    Return up to k 1-1 assignments in order of decreasing total score.
+
+    Each entry is (row_indices, col_indices, total_score) as returned by
+    optimal_assignment, so the first entry is the optimal assignment. If
+    `min_score` is given, pairs scoring below it are never used and rows may
+    stay unassigned; otherwise each assignment covers min(rows, cols) pairs.
+    If `max_gap` is given, only assignments whose total is within max_gap of the
+    optimum are returned, and subproblems below that bound are never queued.
+    Requires SciPy.
+    """
+    if not _HAS_SCIPY:
+        raise ImportError("k_best_assignments requires SciPy")
+
+    S = np.asarray(score_matrix, dtype=float)
+    if S.size == 0 or k <= 0:
+        return []
+
+    transpose = S.shape[0] > S.shape[1]
+    if transpose:
+        S = S.T
+    n_rows, n_cols = S.shape
+
+    if min_score is None:
+        W = S
+    else:
+        # One private zero-score dummy column per row stands for "unassigned";
+        # off-diagonal dummies are forbidden so each partial matching has a
+        # single representation and the ranking contains no duplicates.
+        dummies = np.full((n_rows, n_rows), -np.inf)
+        np.fill_diagonal(dummies, 0.0)
+        W = np.hstack([np.where(S >= min_score, S, -np.inf), dummies])
+
+    root = _solve_subproblem(W, (), frozenset())
+    if root is None:
+        return []
+
+    floor = root[1] - max_gap if max_gap is not None else -np.inf
+    tie = count()
+    # Queue entries are (-total, tie, col_for_row, forced, excluded); unsolved
+    # children carry col_for_row=None and their parent's total as the bound.
+    queue = [(-root[1], next(tie), root[0], (), frozenset())]
+    results: List[Tuple[np.ndarray, np.ndarray, float]] = []
+
+    while queue and len(results) < k:
+        neg_total, _, col_for_row, forced, excluded = heapq.heappop(queue)
+        if col_for_row is None:
+            solved = _solve_subproblem(W, forced, excluded)
+            if solved is not None and solved[1] >= floor:
+                heapq.heappush(queue, (-solved[1], next(tie), solved[0], forced, excluded))
+            continue
+
+        rows = np.arange(n_rows)
+        cols = col_for_row
+        real = cols < n_cols
+        r, c = rows[real], cols[real]
+        if transpose:
+            r, c = c, r
+            order = np.argsort(r)
+            r, c = r[order], c[order]
+        results.append((r, c, -neg_total))
+
+        # Partition the remaining solutions of this node: child t keeps the
+        # first t free pairs of this solution and excludes pair t.
+        forced_rows = {i for i, _ in forced}
+        free_pairs = [(int(i), int(col_for_row[i])) for i in range(n_rows) if i not in forced_rows]
+        child_forced = forced
+        for pair in free_pairs:
+            heapq.heappush(queue, (neg_total, next(tie), None, child_forced, excluded | {pair}))
+            child_forced = child_forced + (pair,)
+
+    return results
@@ -0,0 +1,124 @@
+"""
+Parameter sweep utilities.
+
+Evaluate many (weights, rt_sigma, lmax_sigma) settings against a known
+ground-truth assignment. The component matrices are computed once; every
+setting in the grid is then combined in a single batched tensor expression
+and the resulting assignments are solved in a process pool.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import List, Dict, Optional, Sequence, Tuple
+import numpy as np
+
+from .score_aggregate import build_component_matrices, effective_sigma, gaussian_kernel, optimal_assignment
+
+
+def batched_score_matrices(
+    components: Dict[str, np.ndarray],
+    weight_grid: Sequence[Dict[str, float]],
+    rt_sigmas: Sequence[float],
+    lmax_sigmas: Sequence[float],
+) -> np.ndarray:
+    """
+    Combine component matrices for every grid setting at once.
+
+    Returns an array of shape [len(weight_grid), len(rt_sigmas), len(lmax_sigmas), P, O]
+    whose slices equal combine_component_matrices for the matching setting.
+    """
+    W = np.array([[w.get("ms", 0.0), w.get("rt", 0.0), w.get("lmax", 0.0)] for w in weight_grid], dtype=float)
+    rt_s = np.asarray(rt_sigmas, dtype=float)
+    lm_s = np.asarray(lmax_sigmas, dtype=float)
+
+    ms = components["ms"] * components["ms_mask"]
+    ms_mask = components["ms_mask"].astype(float)
+    rt_mask = components["rt_mask"].astype(float)
+    lm_mask = components["lmax_mask"].astype(float)
+
+    # Kernels per sigma: [R, P, O] and [L, P, O]
+    k_rt = gaussian_kernel(components["rt_delta"][None, :, :], rt_s[:, None, None]) * rt_mask
+    lm_std = components.get("lmax_std", np.zeros((1, 1)))
+    k_lm = gaussian_kernel(components["lmax_delta"][None, :, :], effective_sigma(lm_s[:, None, None], lm_std[None, :, :])) * lm_mask
+
+    w_ms = W[:, 0][:, None, None, None, None]
+    w_rt = W[:, 1][:, None, None, None, None]
+    w_lm = W[:, 2][:, None, None, None, None]
+
+    score = w_ms * ms + w_rt * k_rt[None, :, None] + w_lm * k_lm[None, None, :]
+    wsum = W[:, 0][:, None, None] * ms_mask + W[:, 1][:, None, None] * rt_mask + W[:, 2][:, None, None] * lm_mask
+    wsum = np.broadcast_to(wsum[:, None, None], score.shape)
+    return np.divide(score, wsum, out=np.zeros(score.shape, dtype=float), where=wsum > 0)
+
+
+def _assignment_accuracy(rows: np.ndarray, cols: np.ndarray, truth: Dict[int, int]) -> float:
+    """Fraction of ground-truth (pred_index -> obs_index) pairs recovered."""
+    if not truth:
+        return 0.0
+    assigned = {int(r): int(c) for r, c in zip(rows, cols)}
+    correct = sum(1 for pi, oi in truth.items() if assigned.get(int(pi)) == int(oi))
+    return correct / len(truth)
+
+
+def sweep_parameters(
+    preds: List[Dict],
+    obs: List[Dict],
+    truth: Dict[int, int],
+    weight_grid: Sequence[Dict[str, float]],
+    rt_sigmas: Sequence[float],
+    lmax_sigmas: Sequence[float],
+    mz_tol: float = 0.01,
+    ppm: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Score every combination of weights, rt_sigma and lmax_sigma against a known answer.
+
+    Parameters
+    ----------
+    preds, obs : list of dict
+        Predicted and observed descriptors as accepted by build_score_matrix.
+    truth : dict
+        Known assignment mapping pred_index -> obs_index.
+    weight_grid : sequence of dict
+        Candidate weight dicts with keys 'ms', 'rt', 'lmax'.
+    rt_sigmas, lmax_sigmas : sequence of float
+        Candidate kernel widths.
+    mz_tol, ppm : float
+        MS alignment tolerance, fixed across the sweep.
+    max_workers : Optional[int]
+        Process pool size for the assignment solves; 1 solves in-process.
+
+    Returns
+    -------
+    list of dict
+        One record per setting with 'weights', 'rt_sigma', 'lmax_sigma',
+        'accuracy' and 'total_score', sorted by accuracy then total score.
+    """
+    components = build_component_matrices(preds, obs, mz_tol=mz_tol, ppm=ppm)
+    S = batched_score_matrices(components, weight_grid, rt_sigmas, lmax_sigmas)
+
+    settings: List[Tuple[int, int, int]] = list(product(range(len(weight_grid)), range(len(rt_sigmas)), range(len(lmax_sigmas))))
+    matrices = [S[w, r, l] for w, r, l in settings]
+
+    if max_workers == 1 or len(matrices) <= 1:
+        solved = [optimal_assignment(m) for m in matrices]
+    else:
+        chunksize = max(1, len(matrices) // (4 * (max_workers or 4)))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            solved = list(pool.map(optimal_assignment, matrices, chunksize=chunksize))
+
+    records: List[Dict] = []
+    for (w, r, l), (rows, cols, total) in zip(settings, solved):
+        records.append({
+            "weights": dict(weight_grid[w]),
+            "rt_sigma": float(rt_sigmas[r]),
+            "lmax_sigma": float(lmax_sigmas[l]),
+            "accuracy": _assignment_accuracy(rows, cols, truth),
+            "total_score": float(total),
+        })
+
+    records.sort(key=lambda rec: (rec["accuracy"], rec["total_score"]), reverse=True)
+    return records